@@ -0,0 +1,202 @@
+"""Command-line tools, e.g. to lint notebooks outside Jupyter.
+
+Enter `algoesup lint -h` in a terminal for the options.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from . import magics
+
+# the magics that activate or deactivate the linters within a notebook
+MAGIC = re.compile(r"\s*%(allowed|pytype|ruff)\b(.*)")
+
+
+class CellOutput:
+    """The checkers' output for a notebook cell, like a display handle."""
+
+    def __init__(self, index: int) -> None:
+        """Initialise the output for the code cell with the given index."""
+        self.index = index
+        self.markdown = ""
+
+    def update(self, markdown) -> None:
+        """Store the Markdown object with the checkers' output."""
+        self.markdown = markdown.data
+
+
+def notebook_cells(path: Path) -> list[tuple[int, str]]:
+    """Return the index (from 1) and source of each code cell in the notebook."""
+    with path.open(encoding="utf-8") as file:
+        notebook = json.load(file)
+    sources = []
+    for index, cell in enumerate(notebook["cells"], start=1):
+        if cell["cell_type"] == "code":
+            source = cell["source"]
+            sources.append(
+                (index, source if isinstance(source, str) else "".join(source))
+            )
+    return sources
+
+
+def lint_notebook(path: Path, options: dict[str, str]) -> list[tuple[int, str]]:
+    """Lint the code cells of the notebook and return each cell's checkers' output.
+
+    The `options` map each initially active checker to its options, as given to
+    the magic command after `on`. The notebook's `%allowed`, `%pytype` and `%ruff`
+    magic commands activate, deactivate and configure the checkers as in Jupyter.
+    Each cell is given by its index in the notebook.
+    """
+    # the linters run in this process, without starting another one for each cell
+    magics.backend = "inprocess"
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name in magics.checkers:
+            getattr(magics, name)(f"on {options[name]}" if name in options else "off")
+    magics.cells.clear()
+    outputs = []
+    batch = []  # the cells to lint together
+    for index, source in notebook_cells(path):
+        changes = [m for line in source.splitlines() if (m := MAGIC.match(line))]
+        if changes and batch:
+            magics.lint_batch(batch)  # lint the cells with the previous options
+            batch = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for change in changes:
+                getattr(magics, change.group(1))(change.group(2))
+        start = time.perf_counter()
+        if codes := magics.cell_codes(source, f"cell {index}"):
+            transform = time.perf_counter() - start
+            outputs.append(CellOutput(index))
+            batch.append((codes, outputs[-1], threading.Event(), transform))
+    magics.lint_batch(batch)
+    return [(output.index, output.markdown) for output in outputs if output.markdown]
+
+
+def notebook_paths(paths: list[str]) -> list[Path]:
+    """Return the notebooks given by `paths`, including those in folders."""
+    notebooks = []
+    for name in paths:
+        path = Path(name)
+        if path.is_dir():
+            notebooks.extend(
+                notebook
+                for notebook in sorted(path.rglob("*.ipynb"))
+                if ".ipynb_checkpoints" not in notebook.parts
+            )
+        else:
+            notebooks.append(path)
+    return notebooks
+
+
+def to_markdown(path: Path, outputs: list[tuple[int, str]], error: str = "") -> str:
+    """Return the outputs for the notebook, or why it wasn't linted, as Markdown."""
+    lines = [f"# {path}", ""]
+    if error:
+        lines.extend([f"The notebook couldn't be linted: {error}", ""])
+    for index, markdown in outputs:
+        lines.extend([f"## Cell {index}", "", markdown, ""])
+    if not outputs and not error:
+        lines.extend(["No issues found.", ""])
+    return "\n".join(lines)
+
+
+def lint(args: argparse.Namespace) -> None:
+    """Lint the notebooks and write the checkers' outputs for each one.
+
+    A notebook that can't be read or linted gets the error in its output,
+    and doesn't stop the other notebooks from being linted.
+    """
+    options = {}
+    for name in magics.checkers:
+        if (value := getattr(args, name)) is not None:
+            options[name] = value
+    notebooks = notebook_paths(args.paths)
+    # the output files mirror the notebooks' subfolders from their common folder,
+    # so that notebooks with the same name in different folders don't clash
+    if notebooks:
+        root = os.path.commonpath([path.resolve().parent for path in notebooks])
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        results = [pool.submit(lint_notebook, path, options) for path in notebooks]
+        reports = []
+        for path, result in zip(notebooks, results):
+            error = ""
+            try:
+                outputs = result.result()
+            except Exception as e:  # e.g. the notebook isn't valid JSON
+                outputs = []
+                error = f"{type(e).__name__}: {e}"
+            if args.format == "json":
+                cells = [{"cell": index, "markdown": md} for index, md in outputs]
+                reports.append({"notebook": str(path), "cells": cells})
+                if error:
+                    reports[-1]["error"] = error
+                report = json.dumps(reports[-1], indent=2)
+            else:
+                report = to_markdown(path, outputs, error)
+            if args.output:
+                name = path.resolve().relative_to(root).with_suffix(f".{args.format}")
+                output = Path(args.output) / name
+                output.parent.mkdir(parents=True, exist_ok=True)
+                output.write_text(report, encoding="utf-8")
+            elif args.format == "md":
+                print(report)
+    if args.format == "json" and not args.output:
+        print(json.dumps(reports, indent=2))
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the command given by `argv`, or by the command line if omitted."""
+    parser = argparse.ArgumentParser("algoesup", description=__doc__.split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    linter = commands.add_parser(
+        "lint",
+        help="lint Jupyter notebooks",
+        description="Lint the code cells of Jupyter notebooks, like `%load_ext "
+        "algoesup.magics` does. The notebooks' %allowed, %pytype and %ruff "
+        "magics turn the linters on and off as in Jupyter. Use '=' to give options "
+        "to a linter, e.g. --ruff='--select E'.",
+    )
+    linter.add_argument("paths", nargs="+", help="notebooks or folders of notebooks")
+    for name in magics.checkers:
+        linter.add_argument(
+            f"--{name}",
+            nargs="?",
+            const="",
+            help=f"activate {name} initially, with the given options after `on`",
+        )
+    linter.add_argument(
+        "-f",
+        "--format",
+        choices=["md", "json"],
+        default="md",
+        help="output format: Markdown or JSON (default: md)",
+    )
+    linter.add_argument(
+        "-o",
+        "--output",
+        help="folder for one output file per notebook, in the notebooks' subfolders "
+        "(default: print the outputs)",
+    )
+    linter.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of notebooks linted in parallel (default: number of CPUs)",
+    )
+    args = parser.parse_args(argv)
+    if args.command == "lint":
+        lint(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,24 +4,54 @@ See the [type checking](coding.ipynb#type-checking) and [linting](coding.ipynb#l
 """
 
 import argparse
+import ast
+import contextlib
+import csv
+import hashlib
 import json
+import math
 import os
 import re
 import subprocess
+import signal
 import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 from typing import Callable
 from subprocess import CompletedProcess
 
 from IPython.core.inputtransformer2 import TransformerManager
-from IPython.core.magic import register_line_magic
-from IPython.display import display_markdown
+from IPython.display import DisplayHandle, Markdown, display, display_markdown
+
+from . import runner
+
+# the output parts collected by a thread, instead of being displayed
+collected = threading.local()
+
+
+def show_markdown(text: str) -> None:
+    """Display the Markdown text, unless the current thread is collecting output."""
+    if (parts := getattr(collected, "parts", None)) is None:
+        display_markdown(text, raw=True)
+    else:
+        parts.append(text)
+
+
+def show_text(text: str) -> None:
+    """Print the text, unless the current thread is collecting output."""
+    if (parts := getattr(collected, "parts", None)) is None:
+        print(text)
+    else:
+        parts.append(f"```\n{text}\n```")
 
 
 def show_allowed_errors(checker: str, output: CompletedProcess, filename: str) -> None:
     """Print the errors for the given file in allowed's output."""
     if output.returncode > 0:
-        display_markdown(f"**{checker}** didn't check code:", raw=True)
-        print(output.stderr if output.stderr else output.stdout)
+        show_markdown(f"**{checker}** didn't check code:")
+        show_text(output.stderr if output.stderr else output.stdout)
     else:
         # put empty line before markdown list
         warnings = [f"**{checker}** warnings:", ""]
@@ -34,9 +64,9 @@ def show_allowed_errors(checker: str, output: CompletedProcess, filename: str) -
             if m := re.match(rf".*{filename}[^\d]*(\d+[^:]*:.*)", line):
                 issues.append(f"- {m.group(1)}")
         if len(warnings) > 2:
-            display_markdown("\n".join(warnings), raw=True)
+            show_markdown("\n".join(warnings))
         if len(issues) > 2:
-            display_markdown("\n".join(issues), raw=True)
+            show_markdown("\n".join(issues))
 
 
 def show_ruff_json(checker: str, output: CompletedProcess, filename: str) -> None:
@@ -47,9 +77,9 @@ def show_ruff_json(checker: str, output: CompletedProcess, filename: str) -> Non
             if "warning" in output.stderr.lower()
             else "didn't check code:"
         )
-        display_markdown(f"**{checker}** {text}", raw=True)
-        print(output.stderr)
-    if errors := json.loads(output.stdout):
+        show_markdown(f"**{checker}** {text}")
+        show_text(output.stderr)
+    if errors := json.loads(output.stdout or "[]"):  # no output on invalid options
         md = [f"**{checker}** found issues:", ""]  # empty line before markdown list
         # the following assumes errors come in line order
         for error in errors:
@@ -63,7 +93,7 @@ def show_ruff_json(checker: str, output: CompletedProcess, filename: str) -> Non
                 msg += f". Suggested fix: {error['fix']['message']}"
             md.append(rf"- {line}: \[[{code}]({url})\] {msg}")
         if len(md) > 2:
-            display_markdown("\n".join(md), raw=True)
+            show_markdown("\n".join(md))
 
 
 def show_pytype_errors(checker: str, output: CompletedProcess, filename: str) -> None:
@@ -74,8 +104,8 @@ def show_pytype_errors(checker: str, output: CompletedProcess, filename: str) ->
             if "warning" in output.stderr.lower()
             else "didn't check code:"
         )
-        display_markdown(f"**{checker}** {text}", raw=True)
-        print(output.stderr)
+        show_markdown(f"**{checker}** {text}")
+        show_text(output.stderr)
     md = [f"**{checker}** found issues:", ""]
     for error in output.stdout.split("\n"):
         if "syntax" in error.lower() and "error" in error.lower():
@@ -90,7 +120,7 @@ def show_pytype_errors(checker: str, output: CompletedProcess, filename: str) ->
                 rf"- {line}:{msg}\[[{code}](https://google.github.io/pytype/errors.html#{code})\]"
             )
     if len(md) > 2:
-        display_markdown("\n".join(md), raw=True)
+        show_markdown("\n".join(md))
 
 
 # register the supported checkers, their commands and the output processor
@@ -101,6 +131,169 @@ checkers: dict[str, tuple[str, Callable]] = {
 }
 # initially no checker is active
 active: set[str] = set()
+# by default, wait for the checkers to finish before running the next cell
+background = False
+# seconds to wait in the background for further cells to lint them together
+batch = 0.0
+# by default, run each checker in a new process
+backend = "subprocess"
+# the seconds and MB of memory each checker can use; zero means no limit
+limits: dict[str, tuple[float, int]] = {name: (0, 0) for name in checkers}
+
+# the outputs and linted file names of the latest checks, from oldest to newest
+cache: OrderedDict[str, tuple[CompletedProcess, str]] = OrderedDict()
+cache_lock = threading.Lock()
+cache_size = 1000  # maximum number of cached outputs; 0 disables the cache
+cache_dir = ""  # if not empty, the directory where outputs are also stored
+
+# the times taken by the latest checks, from oldest to newest
+stats: deque[dict] = deque(maxlen=1000)
+STATS_FIELDS = [
+    "time",  # when the check ended, in seconds since the epoch
+    "checker",
+    "cells",  # the number of cells checked together
+    "cached",  # whether the output was cached
+    "returncode",
+    # the seconds taken by each step
+    "transform",
+    "spawn",
+    "run",
+    "render",
+]
+# the cache use and process start time of the latest check in each thread
+timing = threading.local()
+
+
+# the files in the current folder, or above, that may configure the checkers
+CONFIG_FILES = ("pyproject.toml", "ruff.toml", ".ruff.toml", "setup.cfg", "pytype.cfg")
+
+
+def config_times(command: list[str]) -> list[tuple[str, float]]:
+    """Return the modification time of each configuration file `command` may read.
+
+    These are the files given in the command's options, like `allowed`'s
+    configuration, and the files in `CONFIG_FILES` found in the current folder
+    and the folders above it, like ruff's `pyproject.toml`.
+    """
+    paths = [
+        value
+        for option in command[1:]
+        if os.path.isfile(value := option.split("=", 1)[-1])
+    ]
+    folder = os.getcwd()
+    while True:
+        paths.extend(
+            path
+            for name in CONFIG_FILES
+            if os.path.isfile(path := os.path.join(folder, name))
+        )
+        if (parent := os.path.dirname(folder)) == folder:
+            break
+        folder = parent
+    return [(path, os.path.getmtime(path)) for path in paths]
+
+
+def cache_key(checker: str, command: list[str], cell_code: str) -> str:
+    """Return the key of the output of running `command` on `cell_code`.
+
+    The key changes when a configuration file of the command changes,
+    so that its outputs aren't reused (see `config_times`).
+    """
+    key = [command, cell_code, config_times(command)]
+    digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+    return f"{checker}-{digest}"
+
+
+def get_cached(key: str) -> tuple[CompletedProcess, str] | None:
+    """Return the cached output and file name for `key`, or None if not cached."""
+    if not cache_size:
+        return None
+    with cache_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    if not cache_dir:
+        return None
+    try:
+        with open(os.path.join(cache_dir, f"{key}.json")) as file:
+            entry = json.load(file)
+        output = CompletedProcess(
+            entry["args"], entry["returncode"], entry["stdout"], entry["stderr"]
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+    set_cached(key, output, entry["filename"], store=False)
+    return output, entry["filename"]
+
+
+def set_cached(
+    key: str, output: CompletedProcess, filename: str, store: bool = True
+) -> None:
+    """Cache the output and file name for `key`. If `store`, also write them to disk."""
+    if not cache_size:
+        return
+    with cache_lock:
+        cache[key] = (output, filename)
+        cache.move_to_end(key)
+        while len(cache) > cache_size:
+            cache.popitem(last=False)  # remove least recently used
+    if cache_dir and store:
+        entry = {
+            "args": output.args,
+            "returncode": output.returncode,
+            "stdout": output.stdout,
+            "stderr": output.stderr,
+            "filename": filename,
+        }
+        try:
+            with open(os.path.join(cache_dir, f"{key}.json"), "w") as file:
+                json.dump(entry, file)
+        except OSError:
+            pass  # the cache on disk is optional
+
+
+def clear_cache(checker: str = "") -> None:
+    """Remove the cached outputs of `checker`, or of all checkers if none is given."""
+    prefix = f"{checker}-" if checker else ""
+    with cache_lock:
+        for key in [key for key in cache if key.startswith(prefix)]:
+            del cache[key]
+    if cache_dir and os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith(".json"):
+                os.remove(os.path.join(cache_dir, name))
+
+
+def set_command(checker: str, command: list[str]) -> None:
+    """Set the command for `checker` and discard its outputs for other commands."""
+    if checkers[checker][0] != command:
+        clear_cache(checker)
+        checkers[checker][0] = command
+
+
+def add_limit_options(parser: argparse.ArgumentParser) -> None:
+    """Add the options to limit the time and memory a checker can use."""
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="S",
+        help="Stop the linter after running for S seconds (0: no limit).",
+        default=0,
+    )
+    parser.add_argument(
+        "--memory",
+        type=int,
+        metavar="MB",
+        help="Stop the linter if it uses more than MB megabytes (0: no limit).",
+        default=0,
+    )
+
+
+def set_limits(checker: str, timeout: float, memory: int) -> None:
+    """Set the limits for `checker` and discard its outputs with other limits."""
+    if limits[checker] != (timeout, memory):
+        clear_cache(checker)
+        limits[checker] = (max(timeout, 0), max(memory, 0))
 
 
 def process_status(name: str, status: str) -> None:
@@ -109,13 +302,14 @@ def process_status(name: str, status: str) -> None:
         print(name, "is", "active" if name in active else "inactive")
     elif status == "on":
         active.add(name)
+        if backend == "worker" and name in runner.LINTERS:
+            runner.start_worker()
         print(name, "was activated")
     elif status == "off":
         active.discard(name)
         print(name, "was deactivated")
 
 
-@register_line_magic
 def pytype(line: str) -> None:
     """Activate/deactivate the [pytype linter](https://google.github.io/pytype).
 
@@ -136,7 +330,22 @@ def pytype(line: str) -> None:
 
     - name-error: cells often use names defined in previous cells
     - import-error: pytype doesn't find local modules
+
+    The `--notebook` option makes pytype check each cell together with the
+    previously executed cells that define the names it uses, so that it can
+    detect more errors. Only messages about the cell itself are shown.
+    With this option, name errors are reported by default, i.e.
+    `%pytype on --notebook` is equal to `%pytype on --notebook --disable import-error`.
+    Cells executed before `%pytype on --notebook` aren't taken into account.
+
+    The `--timeout S` option stops the linter if it runs for more than S seconds,
+    and the `--memory MB` option stops it if it uses more than MB megabytes,
+    e.g. `%pytype on --notebook --timeout 10 --memory 1000`.
+    The cell's output then says that the linter didn't check the code.
+    By default, there are no limits.
+    Memory limits are only enforced on Linux.
     """
+    global notebook
     parser = argparse.ArgumentParser("pytype")
     parser.add_argument(
         "status",
@@ -149,18 +358,32 @@ def pytype(line: str) -> None:
     parser.add_argument(
         "-d",
         "--disable",
-        default="name-error,import-error",
+        default=None,
         help="Comma or space-separated list of error names to ignore",
     )
+    parser.add_argument(
+        "--notebook",
+        action="store_true",
+        help="Check each cell in the context of the previously executed cells.",
+    )
+    add_limit_options(parser)
     known, unknown = parser.parse_known_args(line.split())
     if known.status != "on" and (known or unknown):
         print("warning: ignoring additional options for %pytype")
     else:
-        checkers["pytype"][0] = ["pytype", "--disable", known.disable] + unknown
+        if known.disable is None:
+            known.disable = (
+                "import-error" if known.notebook else "name-error,import-error"
+            )
+        set_command("pytype", ["pytype", "--disable", known.disable] + unknown)
+        set_limits("pytype", known.timeout, known.memory)
+        notebook = known.notebook
+    if known.status == "off":
+        notebook = False
+        cells.clear()
     process_status("pytype", known.status)
 
 
-@register_line_magic
 def allowed(line: str) -> None:
     """Activate/deactivate the [allowed linter](https://dsa-ou.github.io/allowed).
 
@@ -178,6 +401,12 @@ def allowed(line: str) -> None:
 
     The `--config` option expects `m269.json`, `tm112.json` or the name of a JSON file
     with your own [configuration](https://dsa-ou.github.io/allowed/docs/configuration.html).
+
+    The `--timeout S` option stops the linter if it runs for more than S seconds,
+    and the `--memory MB` option stops it if it uses more than MB megabytes,
+    e.g. `%allowed on -m --timeout 10 --memory 1000`. The cell's output then says
+    that the linter didn't check the code. By default, there are no limits.
+    Memory limits are only enforced on Linux.
     """
     parser = argparse.ArgumentParser("allowed")
     parser.add_argument(
@@ -194,6 +423,7 @@ def allowed(line: str) -> None:
         default=None,
         help="Use configuration file CONFIG (default: m269.json).",
     )
+    add_limit_options(parser)
     known, unknown = parser.parse_known_args(line.split())
     if known.status != "on" and (known or unknown):
         print("warning: allowed not turned on: command options were ignored")
@@ -204,11 +434,11 @@ def allowed(line: str) -> None:
             print("warning: option -f: allowed will flag each issue only once per cell")
     if known.status == "on":
         config = ["-c", known.config] if known.config else []
-        checkers["allowed"][0] = ["allowed"] + config + unknown
+        set_command("allowed", ["allowed"] + config + unknown)
+        set_limits("allowed", known.timeout, known.memory)
     process_status("allowed", known.status)
 
 
-@register_line_magic
 def ruff(line: str) -> None:
     """Activate/deactivate the [Ruff linter](https://docs.astral.sh/ruff).
 
@@ -247,6 +477,12 @@ def ruff(line: str) -> None:
     of [rule codes](https://docs.astral.sh/ruff/rules), without spaces.
     For example, `%ruff on --ignore D203,D213 --select D,E,W` will _only_ check
     pydocstyle and pycodestyle rules, except the two given rules, i.e it will check W292.
+
+    The `--timeout S` option stops the linter if it runs for more than S seconds,
+    and the `--memory MB` option stops it if it uses more than MB megabytes,
+    e.g. `%ruff on --timeout 10 --memory 1000`. The cell's output then says
+    that the linter didn't check the code. By default, there are no limits.
+    Memory limits are only enforced on Linux.
     """
     parser = argparse.ArgumentParser("ruff")
     parser.add_argument(
@@ -269,16 +505,262 @@ def ruff(line: str) -> None:
         type=str,
         default="D100,W292,F401,F821,D203,D213,D415",
     )
+    add_limit_options(parser)
     known, unknown = parser.parse_known_args(line.split())
     if known.status != "on" and (known or unknown):
         print("warning: ignoring additional options for %ruff")
     else:
         base = ["ruff", "check", "--output-format", "json"]
         rules = ["--select", known.select, "--ignore", known.ignore]
-        checkers["ruff"][0] = base + rules + unknown
+        set_command("ruff", base + rules + unknown)
+        set_limits("ruff", known.timeout, known.memory)
     process_status("ruff", known.status)
 
 
+def lint(line: str) -> None:
+    """Set whether the active linters run in the background.
+
+    - `%lint async` runs the linters in the background: the next cell can be executed
+      while the linters are still checking the previous one
+    - `%lint sync` waits for the linters to finish before the next cell is executed
+    - `%lint` shows the current mode
+    - `%lint?` shows this documentation
+
+    In the background mode, the linters' messages appear in the output of the cell
+    once they finish checking it. If a cell is executed again before the linters
+    finished checking it, the outdated checks are stopped.
+    The default mode is `sync`.
+
+    - `%lint async --batch S` waits S seconds after a cell is executed and, if other
+      cells are executed meanwhile, runs each linter once for all those cells,
+      e.g. when running all cells of a notebook
+    - `%lint async --batch 0` lints each cell on its own (default)
+
+    The linters' outputs are cached, so that unchanged cells aren't checked again
+    with the same linter options, e.g. when running all cells of a notebook again.
+
+    - `%lint --cache N` keeps the outputs of the latest N checks (default: 1000);
+      `%lint --cache 0` turns the cache off
+    - `%lint --cache-dir DIR` also stores the outputs in directory DIR,
+      so that they are kept across sessions; `%lint --cache-dir` stops doing so
+    - `%lint --clear-cache` removes all cached outputs; they're not reused anyway
+      after changing a linter's configuration file
+
+    By default, each linter runs in a new process, which takes time to start.
+
+    - `%lint --backend worker` runs `allowed` and `pytype` in a process that is
+      started once and kept running, which is faster after the first check
+    - `%lint --backend inprocess` runs `allowed` and `pytype` within the notebook's
+      process, which is faster after the first check, but only in `sync` mode
+      and if they have no time or memory limits
+    - `%lint --backend subprocess` runs each linter in a new process
+    - `%lint --worker-memory MB` restarts the worker process after a check if it has
+      used more than MB megabytes of memory (default: 1000, 0 means no limit)
+    """
+    global background, backend, batch, cache_size, cache_dir
+    parser = argparse.ArgumentParser("lint")
+    parser.add_argument(
+        "mode",
+        choices=["sync", "async"],
+        type=str.lower,
+        help="Run the linters synchronously or in the background.",
+        nargs="?",
+        default=None,
+    )
+    parser.add_argument(
+        "--batch",
+        type=float,
+        help="Seconds to wait for further cells to lint them together (0: don't).",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache",
+        type=int,
+        help="Maximum number of cached outputs (0: no cache).",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        nargs="?",
+        const="",
+        help="Directory where outputs are also cached. If omitted, don't store them.",
+        default=None,
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Remove all cached outputs.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["subprocess", "worker", "inprocess"],
+        type=str.lower,
+        help="Run the linters in new processes, a worker or the notebook's process.",
+        default=None,
+    )
+    parser.add_argument(
+        "--worker-memory",
+        type=int,
+        help="Memory limit of the worker process, in MB (0: no limit).",
+        default=None,
+    )
+    known = parser.parse_args(line.split())
+    if known.mode:
+        background = known.mode == "async"
+    if known.batch is not None:
+        batch = max(known.batch, 0)
+    if batched and not (background and batch):
+        with batch_lock:
+            if batch_timer:
+                batch_timer.cancel()
+        flush_batch()  # lint the cells waiting for further ones
+    if known.worker_memory is not None:
+        runner.memory_limit = max(known.worker_memory, 0)
+        runner.stop_worker()  # restart it with the new limit when needed
+    if known.backend:
+        backend = known.backend
+    if backend == "worker" and active.intersection(runner.LINTERS):
+        runner.start_worker()
+    elif backend != "worker":
+        runner.stop_worker()
+    if known.clear_cache:
+        clear_cache()
+    if known.cache is not None:
+        cache_size = max(known.cache, 0)
+        with cache_lock:
+            while len(cache) > cache_size:
+                cache.popitem(last=False)
+    if known.cache_dir is not None:
+        if known.cache_dir:
+            os.makedirs(known.cache_dir, exist_ok=True)
+        cache_dir = known.cache_dir
+    print("linters run", "in the background" if background else "synchronously")
+    if background and batch:
+        print(f"cells executed less than {batch}s apart are linted together")
+    if backend == "inprocess":
+        print("allowed and pytype run in the notebook's process")
+    elif backend == "worker":
+        print("allowed and pytype run in a worker process")
+        if runner.memory_limit:
+            print("the worker restarts after using over", runner.memory_limit, "MB")
+    if cache_size:
+        print("the latest", cache_size, "outputs are cached")
+        if cache_dir:
+            print("outputs are also stored in", cache_dir)
+    else:
+        print("outputs aren't cached")
+
+
+def add_stats(
+    checker: str,
+    output: CompletedProcess,
+    times: dict,
+    transform: float,
+    render: float,
+    cells: int = 1,
+) -> None:
+    """Record the time taken by each step of checking the cells with `checker`.
+
+    The `times` are those returned by `timed_run_checker`.
+    """
+    stats.append(
+        {
+            "time": time.time(),
+            "checker": checker,
+            "cells": cells,
+            "cached": times["cached"],
+            "returncode": output.returncode,
+            "transform": transform,
+            "spawn": times["spawn"],
+            "run": times["run"],
+            "render": render,
+        }
+    )
+
+
+def percentile(values: list[float], percent: int) -> float:
+    """Return the smallest value not less than `percent`% of the `values`."""
+    values = sorted(values)
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+def lintstats(line: str) -> None:
+    """Show how long the linters take, to find out which ones slow down the notebook.
+
+    - `%lintstats` shows for each linter the number of checks, how many
+      outputs were cached and how many checks failed, and the 50th, 90th and 99th
+      percentiles of the milliseconds taken by each step of the checks
+    - `%lintstats --csv FILE` and `%lintstats --json FILE` write each check's
+      times to FILE, in seconds
+    - `%lintstats --clear` discards the times recorded so far
+    - `%lintstats --size N` keeps the times of the latest N checks (default: 1000)
+    - `%lintstats?` shows this documentation
+
+    The steps of each check are:
+
+    - transform: turning the cell into Python code, e.g. to replace magic commands
+    - spawn: starting the linter's process, if a new one was started
+    - run: running the linter or getting its cached output
+    - render: processing the linter's output and showing the messages
+
+    When cells are linted together (see `%lint`), each cell has the times
+    of the linter's single run on all those cells.
+    """
+    global stats
+    parser = argparse.ArgumentParser("lintstats")
+    parser.add_argument("--csv", help="Write the recorded times to a CSV file.")
+    parser.add_argument("--json", help="Write the recorded times to a JSON file.")
+    parser.add_argument(
+        "--clear", action="store_true", help="Discard the recorded times."
+    )
+    parser.add_argument(
+        "--size", type=int, help="Maximum number of checks recorded.", default=None
+    )
+    known = parser.parse_args(line.split())
+    records = list(stats)
+    if known.csv:
+        with open(known.csv, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=STATS_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        print("wrote the times of", len(records), "checks to", known.csv)
+    if known.json:
+        with open(known.json, "w") as file:
+            json.dump(records, file, indent=1)
+        print("wrote the times of", len(records), "checks to", known.json)
+    if known.clear:
+        stats.clear()
+    if known.size is not None:
+        stats = deque(stats, maxlen=max(known.size, 1))
+    if known.csv or known.json or known.clear or known.size is not None:
+        return
+    if not records:
+        print("no checks recorded")
+        return
+    md = [
+        "| linter | checks | cached | failed | step | p50 ms | p90 ms | p99 ms |",
+        "|---|--:|--:|--:|---|--:|--:|--:|",
+    ]
+    for checker in sorted({record["checker"] for record in records}):
+        checks = [record for record in records if record["checker"] == checker]
+        cached = sum(check["cached"] for check in checks)
+        failed = sum(check["returncode"] != 0 for check in checks)
+        # the linter's name and counts are only in the first row
+        columns = f"{checker} | {len(checks)} | {cached} | {failed}"
+        for step in ("transform", "spawn", "run", "render", "total"):
+            if step == "total":
+                steps = ("transform", "spawn", "run", "render")
+                values = [sum(check[key] for key in steps) for check in checks]
+            else:
+                values = [check[step] for check in checks]
+            times = " | ".join(
+                f"{percentile(values, percent) * 1000:.0f}" for percent in (50, 90, 99)
+            )
+            md.append(f"| {columns} | {step} | {times} |")
+            columns = " | | | "
+    show_markdown("\n".join(md))
+
+
 def no_e501_warning_on_transformed(cell_code: str) -> str:
     """Append ' # noqa E501' to transformed magic commands"""
     lines = [
@@ -293,58 +775,496 @@ def no_e501_warning_on_transformed(cell_code: str) -> str:
     return "\n".join(lines)
 
 
-def run_checkers(result) -> None:
-    """Run all active checkers after a cell is executed."""
-    if not active:
-        return
-    # Transform IPython to pure Python to avoid linters reporting syntax errors
-    cell_code = TransformerManager().transform_cell(result.info.raw_cell)
-    for checker in sorted(active):
-        command, display = checkers[checker]
-        if checker == "ruff":
-            if cell_code != result.info.raw_cell:
-                # Transformed magics have extra characters added, so suppress
-                # "line too long" warnings (E501)
-                cell_code = no_e501_warning_on_transformed(cell_code)
-            ruff_command = command + [
-                "-",  # Read from stdin
-                "--stdin-filename",
-                "notebook_cell.py",  # Placeholder name for stdin
-            ]
+# the code of the executed cells, in order of execution, with the names each cell
+# defines and uses; only recorded if pytype checks cells in the notebook's context
+cells: OrderedDict[str, tuple[str, set[str], set[str]]] = OrderedDict()
+notebook = False  # check cells in the context of the previously executed cells
+# names that IPython defines in notebooks
+NOTEBOOK_PRELUDE = (
+    "from IPython import get_ipython\nfrom IPython.display import display\n"
+)
+
+
+# the nodes whose assigned names are local to them
+LOCAL_SCOPES = (
+    ast.FunctionDef,
+    ast.AsyncFunctionDef,
+    ast.ClassDef,
+    ast.Lambda,
+    ast.ListComp,
+    ast.SetComp,
+    ast.DictComp,
+    ast.GeneratorExp,
+)
+
+
+def defined_and_used(cell_code: str) -> tuple[set[str], set[str]]:
+    """Return the global names that `cell_code` defines and the names it uses."""
+    defined: set[str] = set()
+    used: set[str] = set()
+    try:
+        tree = ast.parse(cell_code)
+    except SyntaxError:
+        return defined, used
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            used.add(node.id)
+        elif isinstance(node, ast.Global):
+            defined.update(node.names)
+    # the names assigned outside functions, classes and comprehensions are global
+    to_visit: list[ast.AST] = list(tree.body)
+    while to_visit:
+        node = to_visit.pop()
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            defined.add(node.id)
+        elif not isinstance(node, LOCAL_SCOPES):
+            to_visit.extend(ast.iter_child_nodes(node))
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            defined.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                defined.add(alias.asname or alias.name.split(".")[0])
+    return defined, used
+
+
+def add_cell(cell_id: str, cell_code: str) -> None:
+    """Record the latest code executed in the cell with the given id."""
+    cells[cell_id] = (cell_code, *defined_and_used(cell_code))
+    cells.move_to_end(cell_id)
+
+
+def notebook_code(cell_id: str) -> tuple[str, int]:
+    """Return the code of the cell preceded by the code of the cells it depends on.
+
+    Also return the number of lines before the cell's code.
+    A cell depends on the latest executed cells that define the names it uses,
+    and on the cells those cells depend on.
+    """
+    definer = {}  # the latest cell that defines each name
+    for other_id, (_, defined, _) in cells.items():
+        if other_id != cell_id:
+            for name in defined:
+                definer[name] = other_id
+    needed = set()
+    to_visit = [cell_id]
+    while to_visit:
+        for name in cells[to_visit.pop()][2]:
+            if (other_id := definer.get(name)) and other_id not in needed:
+                needed.add(other_id)
+                to_visit.append(other_id)
+    context = NOTEBOOK_PRELUDE + "".join(
+        code + "\n" for other_id, (code, _, _) in cells.items() if other_id in needed
+    )
+    return context + cells[cell_id][0], context.count("\n")
+
+
+def stop(process: subprocess.Popen) -> None:
+    """Kill the process and any processes it started."""
+    if os.name == "posix":
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGKILL)
+    else:
+        process.kill()
+
+
+def run_command(
+    command: list[str],
+    stdin: str | None,
+    cancel: threading.Event | None,
+    timeout: float = 0,
+    memory: int = 0,
+) -> CompletedProcess:
+    """Run `command` with the given input and return its output.
+
+    Raise `CancelledError` and stop the command if `cancel` is set while it runs.
+    Raise `subprocess.TimeoutExpired` and stop the command if it runs for more
+    than `timeout` seconds. If `memory` isn't zero, the command can use
+    at most `memory` MB, on Linux only. Zero means no limit.
+    """
+    deadline = time.monotonic() + timeout
+    start = time.perf_counter()
+    with subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE if stdin is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        # to stop the processes started by the command, like pytype's
+        start_new_session=os.name == "posix",
+    ) as process:
+        timing.spawn = time.perf_counter() - start
+        if memory:
+            # not with preexec_fn, which may deadlock when threads are running
+            runner.limit_memory(memory, process.pid)
+        while True:
             try:
-                output = subprocess.run(
-                    ruff_command,
-                    input=cell_code,
-                    capture_output=True,
-                    text=True,
-                    check=False,
+                # check every 0.1s if the command must be stopped
+                stdout, stderr = process.communicate(
+                    stdin, timeout=0.1 if cancel or timeout else None
                 )
-                display(checker, output, "notebook_cell.py")
-            except Exception as e:
-                print(f"Error on executing {checker}:\n{e}")
+                break
+            except subprocess.TimeoutExpired:
+                stdin = None  # the input was sent by the first call
+                if cancel and cancel.is_set():
+                    stop(process)
+                    raise CancelledError
+                if timeout and time.monotonic() > deadline:
+                    stop(process)
+                    raise subprocess.TimeoutExpired(command, timeout)
+    return CompletedProcess(command, process.returncode, stdout, stderr)
+
+
+def run_checker(
+    checker: str,
+    cell_code: str,
+    cancel: threading.Event | None = None,
+    suffix: str = ".py",
+) -> tuple[CompletedProcess, str]:
+    """Run `checker` on `cell_code`. Return the output and the name of the linted file.
+
+    The `suffix` is the extension of the linted file, e.g. `.ipynb` for ruff
+    to check a notebook.
+    If the same command was run on the same code before, return the cached output.
+    """
+    command = checkers[checker][0]
+    key = cache_key(checker, command, cell_code)
+    timing.cached = bool(cached := get_cached(key))
+    if cached:
+        return cached
+    timeout, memory = limits[checker]
+    try:
+        if checker == "ruff":
+            filename = f"notebook_cell{suffix}"  # Placeholder name for stdin
+            # Read from stdin
+            output = run_command(
+                command + ["-", "--stdin-filename", filename],
+                cell_code,
+                cancel,
+                timeout,
+                memory,
+            )
         else:
+            with tempfile.NamedTemporaryFile(
+                mode="w", suffix=suffix, delete=False
+            ) as temp:
+                temp.write(cell_code)
+            # Handle Windows file paths
+            filename = temp.name.replace("\\", "/")
             try:
-                with tempfile.NamedTemporaryFile(
-                    mode="w", suffix=".py", delete=False
-                ) as temp:
-                    temp.write(cell_code)
-                    # Handle Windows file paths
-                    temp_name = temp.name.replace("\\", "/")
-                lint_file_command = command + [temp_name]
-                try:
-                    output = subprocess.run(
-                        lint_file_command,
-                        capture_output=True,
-                        text=True,
-                        check=False,
-                    )
-                    display(checker, output, temp_name)
-                except Exception as e:
-                    print(f"Error on executing {checker}:\n{e}")
-            except Exception as e:
-                print(f"Error on writing cell to a temporary file:\n{e}")
+                output = run_linter(checker, command + [filename], cancel)
             finally:
-                os.remove(temp_name)
+                os.remove(temp.name)
+    except subprocess.TimeoutExpired:
+        # not cached: the checker may finish in time when the computer is less busy
+        message = f"{checker} was stopped after running for {timeout}s"
+        return CompletedProcess(command, 1, "", message), filename
+    if memory and output.returncode != 0 and not output.stdout:
+        if output.returncode < 0 or "MemoryError" in output.stderr:
+            message = f"{checker} was stopped after using over {memory} MB of memory"
+        else:
+            message = f"{output.stderr}\n{checker} may need over {memory} MB of memory"
+        output = CompletedProcess(command, 1, "", message)
+    set_cached(key, output, filename)
+    return output, filename
+
+
+def timed_run_checker(
+    checker: str,
+    cell_code: str,
+    cancel: threading.Event | None = None,
+    suffix: str = ".py",
+) -> tuple[CompletedProcess, str, dict]:
+    """Run `run_checker` and also return the seconds taken and whether it was cached.
+
+    The returned dictionary has the keys `cached`, `spawn` and `run`.
+    """
+    timing.spawn = 0.0
+    timing.cached = False
+    start = time.perf_counter()
+    output, filename = run_checker(checker, cell_code, cancel, suffix)
+    spawn = timing.spawn
+    run = time.perf_counter() - start - spawn
+    return output, filename, {"cached": timing.cached, "spawn": spawn, "run": run}
+
+
+def run_linter(
+    checker: str, command: list[str], cancel: threading.Event | None
+) -> CompletedProcess:
+    """Run the `command` of `checker` with the current backend and limits."""
+    timeout, memory = limits[checker]
+    if checker in runner.LINTERS and backend == "worker":
+        return runner.check_in_worker(command, cancel, timeout, memory)
+    # in the background, the checker can't capture this process's output,
+    # and in this process, the limits can't be enforced
+    if (
+        checker in runner.LINTERS
+        and backend == "inprocess"
+        and not background
+        and not (timeout or memory)
+    ):
+        return runner.check(command)
+    return run_command(command, None, cancel, timeout, memory)
+
+
+def shift_lines(
+    output: CompletedProcess, filename: str, offset: int, length: int = 0
+) -> CompletedProcess:
+    """Return `output` with line numbers for `filename` reduced by `offset`.
+
+    Drop the lines of output about the first `offset` lines of the file and,
+    if `length` isn't zero, about the lines after the next `length` lines.
+    """
+    lines = []
+    for line in output.stdout.split("\n"):
+        if m := re.match(rf"(.*{re.escape(filename)}[^\d]*)(\d+)(.*)", line):
+            number = int(m.group(2)) - offset
+            if number < 1 or length and number > length:
+                continue
+            line = f"{m.group(1)}{number}{m.group(3)}"
+        lines.append(line)
+    return CompletedProcess(
+        output.args, output.returncode, "\n".join(lines), output.stderr
+    )
+
+
+def lint_cell(
+    codes: dict[str, tuple[str, int]],
+    cancel: threading.Event | None = None,
+    transform: float = 0.0,
+) -> None:
+    """Run the checkers in parallel and show their outputs in the order given.
+
+    For each checker, `codes` has the code to check and the number of lines
+    before the cell's code; the messages about those lines aren't shown.
+    Raise `CancelledError` without showing any output if `cancel` is set meanwhile.
+    The `transform` seconds taken to obtain the codes are recorded in the statistics.
+    """
+    with ThreadPoolExecutor(max_workers=len(codes)) as pool:
+        runs = [
+            pool.submit(timed_run_checker, name, code, cancel)
+            for name, (code, _) in codes.items()
+        ]
+    if cancel and cancel.is_set():
+        raise CancelledError
+    for (checker, (_, offset)), run in zip(codes.items(), runs):
+        try:
+            output, filename, times = run.result()
+        except Exception as e:
+            show_text(f"Error on executing {checker}:\n{e}")
+        else:
+            start = time.perf_counter()
+            if offset:
+                output = shift_lines(output, filename, offset)
+            checkers[checker][1](checker, output, filename)
+            render = time.perf_counter() - start
+            add_stats(checker, output, times, transform, render)
+
+
+# the cancellation event of the latest background run for each cell
+pending: dict[str, threading.Event] = {}
+# runs the checks in the background, one cell at a time
+background_runs = ThreadPoolExecutor(max_workers=1, thread_name_prefix="algoesup")
+
+
+def ruff_cell_output(output: CompletedProcess, cell: int) -> CompletedProcess:
+    """Return the part of ruff's JSON `output` for a notebook about the given cell."""
+    try:
+        errors = json.loads(output.stdout)
+    except ValueError:
+        return output
+    errors = [error for error in errors if error.get("cell") == cell]
+    return CompletedProcess(
+        output.args, output.returncode, json.dumps(errors), output.stderr
+    )
+
+
+def lint_batch(
+    batch: list[tuple[dict, DisplayHandle, threading.Event, float]],
+) -> None:
+    """Run each checker once on all cells in `batch` and show each cell's output.
+
+    Each cell is given by its codes (see `lint_cell`), display handle,
+    cancellation event and transform time. Cells with context lines or
+    syntax errors are linted on their own.
+    """
+    batch = [cell for cell in batch if not cell[2].is_set()]
+    alone = [
+        cell
+        for cell in batch
+        if any(offset for _, offset in cell[0].values())
+        or not compiles(next(iter(cell[0].values()))[0])
+    ]
+    together = [cell for cell in batch if cell not in alone]
+    for cell in alone:
+        lint_in_background(*cell)
+    if len(together) < 2:
+        for cell in together:
+            lint_in_background(*cell)
+        return
+    # all cells have the same checkers, unless some were turned on or off meanwhile
+    names = sorted(set().union(*(cell[0] for cell in together)))
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        runs = {}
+        for name in names:
+            cell_codes = [cell[0][name][0] for cell in together if name in cell[0]]
+            if name == "ruff":
+                # ruff checks a notebook's cells separately, e.g. for E402
+                notebook_json = {
+                    "cells": [
+                        {
+                            "cell_type": "code",
+                            "execution_count": None,
+                            "metadata": {},
+                            "outputs": [],
+                            "source": code,
+                        }
+                        for code in cell_codes
+                    ],
+                    "metadata": {"language_info": {"name": "python"}},
+                    "nbformat": 4,
+                    "nbformat_minor": 5,
+                }
+                code = json.dumps(notebook_json)
+                runs[name] = pool.submit(timed_run_checker, name, code, None, ".ipynb")
+            else:
+                runs[name] = pool.submit(timed_run_checker, name, "\n".join(cell_codes))
+    # the number of cells and lines before the current cell, for each checker
+    cells_before = dict.fromkeys(names, 0)
+    lines_before = dict.fromkeys(names, 0)
+    for codes, handle, cancel, transform in together:
+        collected.parts = []
+        for checker, (code, _) in codes.items():
+            length = code.count("\n") + 1
+            try:
+                output, filename, times = runs[checker].result()
+            except Exception as e:
+                show_text(f"Error on executing {checker}:\n{e}")
+            else:
+                start = time.perf_counter()
+                if checker == "ruff":
+                    output = ruff_cell_output(output, cells_before[checker] + 1)
+                else:
+                    output = shift_lines(
+                        output, filename, lines_before[checker], length
+                    )
+                checkers[checker][1](checker, output, filename)
+                render = time.perf_counter() - start
+                add_stats(checker, output, times, transform, render, len(together))
+            cells_before[checker] += 1
+            lines_before[checker] += length
+        parts, collected.parts = collected.parts, None
+        if not cancel.is_set():
+            handle.update(Markdown("\n\n".join(parts)))
+
+
+def compiles(code: str) -> bool:
+    """Return whether `code` has no syntax errors."""
+    try:
+        ast.parse(code)
+    except SyntaxError:
+        return False
+    return True
+
+
+# the cells executed recently, waiting to be linted together
+batched: list[tuple[dict, DisplayHandle, threading.Event, float]] = []
+batch_timer: threading.Timer | None = None
+batch_lock = threading.Lock()
+
+
+def flush_batch() -> None:
+    """Lint the batched cells in the background."""
+    global batched
+    with batch_lock:
+        cells_to_lint, batched = batched, []
+    with contextlib.suppress(RuntimeError):  # raised if Python is shutting down
+        background_runs.submit(lint_batch, cells_to_lint)
+
+
+def add_to_batch(
+    codes: dict[str, tuple[str, int]],
+    handle: DisplayHandle,
+    cancel: threading.Event,
+    transform: float = 0.0,
+) -> None:
+    """Add the cell to the batch and lint it if no other cell is executed soon."""
+    global batch_timer
+    with batch_lock:
+        batched.append((codes, handle, cancel, transform))
+        if batch_timer:
+            batch_timer.cancel()
+        batch_timer = threading.Timer(batch, flush_batch)
+        batch_timer.daemon = True
+        batch_timer.start()
+
+
+def lint_in_background(
+    codes: dict[str, tuple[str, int]],
+    handle: DisplayHandle,
+    cancel: threading.Event,
+    transform: float = 0.0,
+) -> None:
+    """Run `lint_cell` and show its output in the display `handle`."""
+    if cancel.is_set():
+        return
+    collected.parts = []
+    try:
+        lint_cell(codes, cancel, transform)
+    except CancelledError:
+        return
+    finally:
+        parts, collected.parts = collected.parts, None
+    handle.update(Markdown("\n\n".join(parts)))
+
+
+def cell_codes(raw_cell: str, cell_id: str | None) -> dict[str, tuple[str, int]]:
+    """Return the code each active checker must check for the executed cell.
+
+    See `lint_cell` for the format of the returned dictionary.
+    """
+    if not (active or notebook):
+        return {}
+    # Transform IPython to pure Python to avoid linters reporting syntax errors
+    cell_code = TransformerManager().transform_cell(raw_cell)
+    if notebook:
+        add_cell(cell_id or f"#{len(cells)}", cell_code)
+    codes = {name: (cell_code, 0) for name in sorted(active)}
+    if "ruff" in codes and cell_code != raw_cell:
+        # Transformed magics have extra characters added, so suppress
+        # "line too long" warnings (E501)
+        codes["ruff"] = (no_e501_warning_on_transformed(cell_code), 0)
+    if "pytype" in codes and notebook:
+        codes["pytype"] = notebook_code(next(reversed(cells)))
+    return codes
+
+
+def run_checkers(result) -> None:
+    """Run all active checkers after a cell is executed.
+
+    The checkers run in parallel, so that the time taken is that of the slowest
+    checker, but their outputs are always shown in alphabetical order.
+    In background mode, return immediately and show the outputs when available.
+    """
+    # Outside notebooks, cells have no id and can't be re-executed
+    cell_id = result.info.cell_id
+    start = time.perf_counter()
+    if not (codes := cell_codes(result.info.raw_cell, cell_id)):
+        return
+    transform = time.perf_counter() - start
+    if not background:
+        lint_cell(codes, transform=transform)
+        return
+    cancel = threading.Event()
+    if cell_id:
+        if cell_id in pending:
+            pending[cell_id].set()  # stop outdated checks of the same cell
+        pending[cell_id] = cancel
+    handle = display(Markdown(""), display_id=True)
+    if batch:
+        add_to_batch(codes, handle, cancel, transform)
+    else:
+        background_runs.submit(lint_in_background, codes, handle, cancel, transform)
 
 
 def load_ipython_extension(ipython):
@@ -354,5 +1274,10 @@ def load_ipython_extension(ipython):
     in this module can be loaded with `load_ext algoesup.magics`. Additionally, register
     `run_checkers` with the `post_run_cell` event so the linters are run with the
     contents of each Ipython cell after it has been executed.
+
+    The magics are registered here rather than when the module is imported,
+    so that the module can also be used outside IPython, e.g. by `algoesup lint`.
     """
+    for magic in (pytype, allowed, ruff, lint, lintstats):
+        ipython.register_magic_function(magic, "line")
     ipython.events.register("post_run_cell", run_checkers)  # type: ignore[name-defined]
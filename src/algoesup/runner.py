@@ -0,0 +1,245 @@
+"""Run linters written in Python without starting a new interpreter for each check.
+
+The linters' command-line entry points are imported once and then called directly,
+with the standard output and error streams captured, either in the calling process
+or in a long-lived worker process.
+"""
+
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import CancelledError
+from importlib.metadata import entry_points
+from queue import Empty, Queue
+from subprocess import CompletedProcess
+from typing import IO, Callable
+
+# the linters that can be run in-process
+LINTERS = ("allowed", "pytype")
+
+mains: dict[str, Callable] = {}  # the loaded entry points, by script name
+# the standard streams are global, so only one linter can run at a time
+lock = threading.Lock()
+
+
+def load(script: str) -> Callable:
+    """Return the entry point of the console `script`, importing it if necessary."""
+    if script not in mains:
+        if not (found := entry_points(group="console_scripts", name=script)):
+            raise FileNotFoundError(f"No such command: '{script}'")
+        mains[script] = next(iter(found)).load()
+    return mains[script]
+
+
+def run(main: Callable, command: list[str]) -> CompletedProcess:
+    """Call `main()` with `command` as the command line and return its output."""
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with lock, contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        argv = sys.argv
+        sys.argv = command
+        try:
+            returncode = main() or 0
+        except SystemExit as e:
+            if isinstance(e.code, str):
+                print(e.code, file=sys.stderr)
+            returncode = e.code if isinstance(e.code, int) else int(bool(e.code))
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+        finally:
+            sys.argv = argv
+    return CompletedProcess(command, returncode, stdout.getvalue(), stderr.getvalue())
+
+
+def run_pytype() -> int:
+    """Check the file given in the command line with pytype and return the exit code.
+
+    Unlike pytype's command, this doesn't start a subprocess for the file.
+    """
+    # pytype is imported only when needed, as it isn't available on Windows
+    from pytype import config
+    from pytype import io as pytype_io
+
+    options = config.Options(sys.argv[1:], command_line=True)
+    return pytype_io.process_one_file(options)
+
+
+def check(command: list[str]) -> CompletedProcess:
+    """Run the linter `command` in this process and return its output.
+
+    The command must end with the file to check. The output is like
+    that of running the command in a subprocess.
+    """
+    if command[0] != "pytype":
+        return run(lambda: load(command[0])(), command)
+    output = run(run_pytype, command)
+    # pytype reports errors on stdout and without colours,
+    # but when checking a single file, they are reported on stderr
+    stderr = re.sub(r"\x1b\[[0-9;]*m", "", output.stderr)
+    if output.returncode in (0, 1) and (command[-1] in stderr or not stderr):
+        return CompletedProcess(command, output.returncode, output.stdout + stderr, "")
+    return CompletedProcess(command, output.returncode, output.stdout, stderr)
+
+
+# Worker process
+# --------------
+
+worker = None  # the process that runs the linters, once started
+replies = None  # the worker's replies, read by a separate thread
+worker_lock = threading.Lock()  # the worker runs one command at a time
+memory_limit = 1000  # MB of memory the worker can use before it's restarted
+
+
+def used_memory() -> float:
+    """Return the peak memory used by this process, in MB, or 0 if not known."""
+    try:
+        import resource  # not available on Windows
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # the peak is in bytes on macOS and in KB on Linux
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def limit_memory(memory: int, pid: int = 0) -> None:
+    """Let this process use at most `memory` MB, or any amount if zero.
+
+    If `pid` is given, limit that process instead, which is only possible on Linux.
+    Otherwise, the limit is only set on Unix systems and enforced on Linux.
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    if pid and not hasattr(resource, "prlimit"):
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    soft = memory * 1024**2 if memory else hard
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    if pid:
+        with contextlib.suppress(ProcessLookupError):  # if it already ended
+            resource.prlimit(pid, resource.RLIMIT_AS, (soft, hard))
+    else:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def serve(limit: int) -> None:
+    """Run the linter commands read from stdin and write their outputs to stdout.
+
+    Each command, with the MB of memory it can use (0: no limit), and each output
+    is a JSON list on a line of its own.
+    Stop at the end of the input or after using more than `limit` MB of memory.
+    """
+    # keep stdout for the outputs and send anything else printed to stderr
+    outputs = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    # load the linters before the first command, by checking an empty file
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as temp:
+        pass
+    for linter in LINTERS:
+        check([linter, temp.name])
+    os.remove(temp.name)
+    for line in sys.stdin:
+        command, memory = json.loads(line)
+        limit_memory(memory)
+        try:
+            output = check(command)
+        finally:
+            limit_memory(0)
+        print(
+            json.dumps([output.returncode, output.stdout, output.stderr]), file=outputs
+        )
+        outputs.flush()
+        if limit and used_memory() > limit:
+            return
+
+
+def read_replies(stream: IO[str], queue: Queue) -> None:
+    """Put each line of JSON read from `stream` in the `queue`, then put None."""
+    for line in stream:
+        queue.put(json.loads(line))
+    queue.put(None)
+
+
+def start_worker() -> None:
+    """Start the worker process, unless it's running."""
+    global worker, replies
+    if worker and worker.poll() is None:
+        return
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "algoesup.runner", str(memory_limit)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    replies = Queue()
+    threading.Thread(
+        target=read_replies, args=(worker.stdout, replies), daemon=True
+    ).start()
+
+
+def stop_worker() -> None:
+    """Stop the worker process, if it's running."""
+    global worker
+    if worker:
+        worker.kill()
+        worker.wait()
+        worker.stdin.close()
+    worker = None
+
+
+def check_in_worker(
+    command: list[str],
+    cancel: threading.Event | None = None,
+    timeout: float = 0,
+    memory: int = 0,
+) -> CompletedProcess:
+    """Run the linter `command` in the worker process and return its output.
+
+    Restart the worker if it isn't running, e.g. because it crashed.
+    Raise `CancelledError` and stop the worker if `cancel` is set meanwhile.
+    Raise `subprocess.TimeoutExpired` and stop the worker if the command runs
+    for more than `timeout` seconds. If `memory` isn't zero, the worker can use
+    at most `memory` MB while running the command. Zero means no limit.
+    """
+    with worker_lock:
+        for _ in range(2):
+            start_worker()
+            deadline = time.monotonic() + timeout
+            try:
+                worker.stdin.write(json.dumps([command, memory]) + "\n")
+                worker.stdin.flush()
+                while True:
+                    # check every 0.1s if the command must be stopped
+                    try:
+                        reply = replies.get(timeout=0.1)
+                        break
+                    except Empty:
+                        if cancel and cancel.is_set():
+                            stop_worker()
+                            raise CancelledError
+                        if timeout and time.monotonic() > deadline:
+                            stop_worker()
+                            raise subprocess.TimeoutExpired(command, timeout)
+            except OSError:
+                reply = None
+            if reply is None:
+                stop_worker()  # try again with a new worker
+            else:
+                returncode, stdout, stderr = reply
+                return CompletedProcess(command, returncode, stdout, stderr)
+    raise RuntimeError("the linter worker process stopped unexpectedly")
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]))
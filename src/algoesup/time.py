@@ -1,9 +1,28 @@
 """Tools for measuring and plotting run-times, see the [examples](coding.ipynb#performance-analysis)."""
 
-from typing import Callable
+from copy import deepcopy
+from functools import partial
+from types import ModuleType
+from typing import Callable, Iterator, NamedTuple
 
+import csv
+import datetime
+import gc
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import threading
 import timeit
+import tracemalloc
+from time import perf_counter_ns
 import matplotlib.pyplot as plt
+import numpy as np
+from IPython import get_ipython
 
 
 # Input generators
@@ -30,15 +49,126 @@ def scale_and_unit(seconds: float) -> tuple[int, str]:
     return 1, "s"
 
 
-def time_it(function: Callable, *args, loops=0, repeat=3) -> float:
+def memory_scale_and_unit(size: float) -> tuple[float, str]:
+    """Given a memory size in bytes, return the appropriate scale factor and unit."""
+    if size < 1024:
+        return 1, "B"
+    if size < 1024**2:
+        return 1 / 1024, "KB"
+    if size < 1024**3:
+        return 1 / 1024**2, "MB"
+    return 1 / 1024**3, "GB"
+
+
+# the maximum number of input copies made at once, to limit the memory used
+COPY_BATCH = 1000
+
+
+def time_copies(function: Callable, args: tuple, loops: int) -> float:
+    """Return the seconds taken by `loops` calls of `function` on copies of `args`.
+
+    The copies are made in batches before the calls and aren't timed.
+    """
+    run_time = 0.0
+    for batch in range(0, loops, COPY_BATCH):
+        copies = [deepcopy(args) for _ in range(min(COPY_BATCH, loops - batch))]
+        gc_was_enabled = gc.isenabled()
+        gc.disable()  # like timeit, don't time garbage collection
+        try:
+            start = timeit.default_timer()
+            for instance in copies:
+                function(*instance)
+            run_time += timeit.default_timer() - start
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    return run_time
+
+
+def direct_timer(function: Callable, args: tuple) -> timeit.Timer:
+    """Return a timer that calls `function` on `args` in a compiled loop.
+
+    The function and its arguments are local variables of the loop, which
+    calls the function directly, without a lambda or unpacking the arguments.
+    """
+    names = [f"arg{index}" for index in range(len(args))]
+    setup = ["function = _function"]
+    setup += [f"{name} = _args[{index}]" for index, name in enumerate(names)]
+    return timeit.Timer(
+        f"function({', '.join(names)})",
+        "; ".join(setup),
+        globals={"_function": function, "_args": args},
+    )
+
+
+overhead = 0.0  # the seconds per iteration of an empty timing loop, once measured
+clock_pair = 0  # the nanoseconds between two calls of perf_counter_ns, once measured
+
+
+def loop_overhead() -> float:
+    """Return the seconds that each iteration of the timing loop adds to a call.
+
+    It's measured once per process, on an empty loop.
+    """
+    global overhead
+    if not overhead:
+        timer = timeit.Timer()
+        loops, _ = timer.autorange()
+        overhead = min(timer.repeat(5, loops)) / loops
+    return overhead
+
+
+def loop_timer(function: Callable, args: tuple, copy: bool) -> Callable[[int], float]:
+    """Return a function that returns the seconds taken by that many calls.
+
+    The calls are of `function` on `args` or, if `copy` is true, on copies of them.
+    """
+    if copy:
+        return lambda loops: time_copies(function, args, loops)
+    return direct_timer(function, args).timeit
+
+
+def calibrate(timer: Callable[[int], float], seconds: float) -> tuple[int, float]:
+    """Return how many loops the `timer` needs to take `seconds`, and the time taken.
+
+    The number of loops is doubled from 1 until the time is long enough.
+    """
+    loops = 1
+    while (run_time := timer(loops)) < seconds:
+        loops *= 2
+    return loops, run_time
+
+
+def without_overhead(run_time: float, error: float) -> tuple[float, float]:
+    """Return the run-time minus the loop overhead, and the precision of the result.
+
+    The `error` is the run-time's precision, relative to the run-time.
+    """
+    net = max(run_time - loop_overhead(), 0)
+    return net, run_time * error / net if net else 0
+
+
+def time_it(function: Callable, *args, loops=0, repeat=3, copy=False) -> float:
     """Return the fastest time, in seconds, of running `function` on `*args`.
 
     By default (zero loops), use enough loops to take >= 0.2 seconds.
+    If `copy` is true, each call gets a fresh copy of the input, made beforehand,
+    so that functions that modify their input, e.g. sort in-place, are timed correctly.
+    The time includes the overhead of the timing loop (see `loop_overhead`).
     """
     assert loops >= 0, "loops must be non-negative"
     assert repeat > 0, "repeat must be positive"
 
-    timer = timeit.Timer(lambda: function(*args))
+    if copy:
+        timer = loop_timer(function, args, copy)
+        if loops == 0:
+            loops, run_time = calibrate(timer, 0.2)
+            run_times = [timer(loops) for _ in range(repeat - 1)]
+            run_times.append(run_time)
+        else:
+            run_times = [timer(loops) for _ in range(repeat)]
+        return min(run_times) / loops
+    timer = direct_timer(function, args)
     if loops == 0:
         loops, run_time = timer.autorange()
         run_times = timer.repeat(repeat - 1, loops)
@@ -48,19 +178,1150 @@ def time_it(function: Callable, *args, loops=0, repeat=3) -> float:
     return min(run_times) / loops
 
 
+# the 97.5% quantiles of Student's t distribution with 1 to 30 degrees of freedom
+T_QUANTILES = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]  # fmt: skip
+
+
+def t_quantile(df: int) -> float:
+    """Return the 97.5% quantile of Student's t distribution with `df` > 0 degrees.
+
+    Look up the exact quantile for up to 30 degrees of freedom. Above that,
+    use the Cornish-Fisher expansion, which is then accurate to 3 decimal places.
+    """
+    if df <= len(T_QUANTILES):
+        return T_QUANTILES[df - 1]
+    z = 1.959964  # the 97.5% quantile of the normal distribution
+    return (
+        z
+        + (z**3 + z) / (4 * df)
+        + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+        + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3)
+    )
+
+
+def time_precisely(
+    function: Callable,
+    *args,
+    precision: float = 0.05,
+    budget: float = 5,
+    copy: bool = False,
+) -> tuple[float, float]:
+    """Return the mean run-time of `function` on `*args`, in seconds, and its precision.
+
+    Take samples of enough loops to take >= 0.01 seconds until the 95% confidence
+    interval of the mean is within `precision` of the mean (e.g. 0.05 for ±5%)
+    or after `budget` seconds. Return the mean and the achieved precision,
+    i.e. the half-width of the confidence interval divided by the mean.
+    At least 5 samples are taken within the budget, and at least 2 in any case,
+    so slow functions may exceed the budget by up to two samples.
+    Stable functions are timed for less than `budget` seconds.
+    If `copy` is true, each call gets a fresh copy of the input (see `time_it`).
+    """
+    assert precision > 0, "precision must be positive"
+    assert budget > 0, "budget must be positive"
+
+    timer = loop_timer(function, args, copy)
+    end = timeit.default_timer() + budget
+    loops, run_time = calibrate(timer, 0.01)
+    samples = [run_time / loops]
+    mean = samples[0]
+    error = math.inf
+    while (
+        len(samples) < 2
+        or timeit.default_timer() < end
+        and (error > precision or len(samples) < 5)
+    ):
+        samples.append(timer(loops) / loops)
+        mean, error = mean_and_precision(samples)
+    return mean, error
+
+
+def mean_and_precision(samples: list[float]) -> tuple[float, float]:
+    """Return the mean of two or more run-times and its precision.
+
+    The precision is the half-width of the 95% confidence interval of the mean
+    divided by the mean.
+    """
+    mean = sum(samples) / len(samples)
+    variance = sum((x - mean) ** 2 for x in samples) / (len(samples) - 1)
+    half_width = t_quantile(len(samples) - 1) * math.sqrt(variance / len(samples))
+    return mean, half_width / mean if mean else 0
+
+
+# the shortest time of a sample, so that reading the clock doesn't dominate it
+SAMPLE_TIME = 1e-6
+# the percentiles that describe the distribution of sampled run-times
+PERCENTILES = {"min": 0, "median": 50, "p90": 90, "p99": 99, "max": 100}
+
+
+def time_samples(
+    function: Callable, *args, samples: int = 1000, batch: int = 1, copy=False
+) -> np.ndarray:
+    """Return `samples` run-times, in seconds, of calling `function` on `*args`.
+
+    Each sample times `batch` consecutive calls with `time.perf_counter_ns` and
+    is divided by `batch`. Use a batch of a few calls to time functions that take
+    less than a microsecond, as each sample includes reading the clock.
+    The garbage collector isn't disabled, so that its pauses, like any other
+    occasional slow calls, show in the distribution of the samples.
+    If `copy` is true, each call gets a fresh copy of the input, made before
+    the sample's calls and not timed.
+    """
+    assert samples > 0, "the number of samples must be positive"
+    assert batch > 0, "the batch size must be positive"
+    durations = np.zeros(samples, dtype=np.int64)  # allocated before timing
+    copies = [args] * batch
+    for index in range(samples):
+        if copy:
+            copies = [deepcopy(args) for _ in range(batch)]
+        start = perf_counter_ns()
+        for instance in copies:
+            function(*instance)
+        durations[index] = perf_counter_ns() - start
+    return durations / (batch * 1e9)
+
+
+def peak_memory(function: Callable, *args, copy: bool = False) -> int:
+    """Return the peak memory, in bytes, allocated by calling `function` on `*args`.
+
+    The memory is traced with `tracemalloc`, which sees the allocations made by
+    Python code and by extension modules that report them, like NumPy.
+    The memory already used by the input isn't included. If `copy` is true,
+    the function is called on a copy of the input, made before tracing.
+    Tracing makes the call much slower, so don't time it at the same time.
+    """
+    if copy:
+        args = deepcopy(args)
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return max(peak - before, 0)
+
+
+def doubling_sizes(start: int, double: int) -> list[int]:
+    """Return the input sizes from `start`, doubled `double` times."""
+    sizes = [start]
+    for _ in range(double):
+        sizes.append(sizes[-1] * 2)
+    return sizes
+
+
+def schedule_sizes(
+    start: int, steps: int, factor: float = 2, step: int = 0
+) -> list[int]:
+    """Return the input sizes from `start`, increased `steps` times.
+
+    If `step` is positive, each size is `step` more than the previous one,
+    otherwise it's `factor` times the previous one, rounded to the nearest integer
+    but always larger than the previous one.
+    """
+    sizes = [start]
+    for index in range(1, steps + 1):
+        size = start + index * step if step else round(start * factor**index)
+        sizes.append(max(size, sizes[-1] + 1))
+    return sizes
+
+
+def adaptive_size(sizes: np.ndarray, times: np.ndarray) -> int | None:
+    """Return a new size where the growth of the run-times changes most, or None.
+
+    The `times` have a row of run-times for each function, one per size.
+    The growth between consecutive sizes is the slope of the run-times
+    on a log-log scale. The new size is the geometric mean of the consecutive
+    sizes with the largest changes of slope at either end, widest first.
+    Return None if there's no integer size between any consecutive sizes.
+    """
+    widths = np.diff(np.log(sizes))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = np.diff(np.log(times), axis=1) / widths
+        changes = np.abs(np.diff(slopes, axis=1))
+    # the largest change of slope at each size, zero for the first and last sizes
+    changes = np.where(np.isnan(changes), 0, changes).max(axis=0, initial=0)
+    changes = np.concatenate([[0], changes, [0]])
+    scores = changes[:-1] + changes[1:]  # the changes at both ends of each interval
+    for interval in sorted(range(len(widths)), key=lambda i: (-scores[i], -widths[i])):
+        lower, upper = sizes[interval], sizes[interval + 1]
+        size = round(math.sqrt(lower * upper))
+        if lower < size < upper:
+            return size
+    return None
+
+
+# Timing cache
+# ------------
+
+cache_dir = ""  # if not empty, the directory where run-times are stored
+cache_size = 1000  # maximum number of run-times stored; the least recently used go
+
+
+def cache_timings(directory: str = ".timings", size: int = 1000) -> None:
+    """Store run-times in `directory`, to reuse them instead of timing again.
+
+    The run-time of a function on the input of a given size is reused if the code
+    of the function and of its input generator, the timing settings and the machine
+    are the same. Functions called by them aren't checked for changes: pass
+    `force=True` to the timing function to measure and store the run-times anew.
+    At most `size` run-times are stored, removing the least recently used ones.
+    If `directory` is empty, run-times are neither reused nor stored.
+    """
+    global cache_dir, cache_size
+    assert size > 0, "the size must be positive"
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    cache_dir = directory
+    cache_size = size
+
+
+def code_digest(function: Callable) -> str:
+    """Return a digest of the code of `function`, or of its name if not in Python.
+
+    The digest doesn't depend on where the code is, e.g. in which notebook cell,
+    but does depend on the values captured by a closure, on the object
+    of a bound method and on the arguments given to a `functools.partial`.
+    """
+    if isinstance(function, partial):
+        parts = [code_digest(function.func), repr(function.args)]
+        parts.append(repr(sorted(function.keywords.items())))
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+    owner = getattr(function, "__self__", None)
+    if owner is not None and not isinstance(owner, ModuleType):
+        # a bound method, e.g. of an instance, a class or a built-in object
+        if method := getattr(function, "__func__", None):
+            parts = [code_digest(method)]
+        else:
+            parts = [f"{type(owner).__module__}.{function.__qualname__}"]
+        if isinstance(owner, type):
+            parts.append(f"{owner.__module__}.{owner.__qualname__}")
+        else:
+            parts.append(type(owner).__qualname__)
+            parts.append(repr(getattr(owner, "__dict__", owner)))  # its state
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+    if not hasattr(function, "__code__"):
+        # e.g. a built-in function or a method descriptor like `list.sort`
+        owner = getattr(function, "__objclass__", type(function))
+        module = getattr(function, "__module__", None) or owner.__module__
+        return f"{module}.{getattr(function, '__qualname__', repr(function))}"
+    parts = [function.__qualname__, repr(function.__defaults__)]
+    for cell in function.__closure__ or ():
+        try:
+            value = cell.cell_contents
+        except ValueError:  # the variable isn't assigned yet
+            value = None
+        parts.append(code_digest(value) if callable(value) else repr(value))
+
+    def add(code) -> None:
+        parts.append(code.co_code.hex())
+        parts.extend(code.co_names)
+        for constant in code.co_consts:
+            if hasattr(constant, "co_code"):
+                add(constant)  # e.g. the code of a nested function
+            else:
+                parts.append(repr(constant))
+
+    add(function.__code__)
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def cpu_model() -> str:
+    """Return the name of the CPU model, if known, otherwise the processor type."""
+    try:
+        with open("/proc/cpuinfo") as file:  # on Linux
+            for line in file:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def machine_fingerprint() -> list[str]:
+    """Return what identifies this machine and Python version for timing.
+
+    The host name isn't included, as it changes with each session
+    on some hosted notebook services.
+    """
+    return [
+        platform.system(),
+        platform.machine(),
+        cpu_model(),
+        str(os.cpu_count()),
+        platform.python_implementation(),
+        platform.python_version(),
+    ]
+
+
+def cache_key(function: Callable, inputs: Callable, size: int, settings: list) -> str:
+    """Return the key of the run-time of `function` on the input of the given size."""
+    key = [code_digest(function), code_digest(inputs), size, settings]
+    key.append(machine_fingerprint())
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+def get_cached(key: str) -> tuple[float, float] | None:
+    """Return the stored run-time and precision for `key`, or None if not stored."""
+    if not cache_dir:
+        return None
+    path = os.path.join(cache_dir, f"{key}.json")
+    try:
+        with open(path) as file:
+            run_time, error = json.load(file)
+        os.utime(path)  # mark it as recently used
+    except (OSError, ValueError):
+        return None
+    return run_time, error
+
+
+def set_cached(key: str, result: tuple[float, float]) -> None:
+    """Store the run-time and precision for `key`, removing the least recently used."""
+    if not cache_dir:
+        return
+    try:
+        with open(os.path.join(cache_dir, f"{key}.json"), "w") as file:
+            json.dump(result, file)
+        paths = [
+            os.path.join(cache_dir, name)
+            for name in os.listdir(cache_dir)
+            if name.endswith(".json")
+        ]
+        if len(paths) > cache_size:
+            paths.sort(key=os.path.getmtime)
+            for path in paths[: len(paths) - cache_size]:
+                os.remove(path)
+    except OSError:
+        pass  # the cache is optional
+
+
+# Parallel timing
+# ---------------
+
+# the measuring functions, the functions and their inputs to time,
+# inherited by the worker processes
+tasks: list[tuple[Callable, Callable, tuple]] = []
+
+
+def free_cores() -> set[int]:
+    """Return the CPU cores this process may use that aren't busy with other work.
+
+    Return the empty set if the cores can't be determined, e.g. on macOS and Windows.
+    """
+    if not hasattr(os, "sched_getaffinity"):
+        return set()
+    cores = sorted(os.sched_getaffinity(0))
+    busy = math.ceil(os.getloadavg()[0])  # processes running or waiting to run
+    return set(cores[busy:])
+
+
+def pin_worker(cores) -> None:
+    """Pin the current worker process to one of the `cores` not used by others."""
+    os.sched_setaffinity(0, {cores.get()})
+
+
+def time_task(index: int) -> tuple[float, float]:
+    """Return the measurement of the task with the given index."""
+    timer, function, instance = tasks[index]
+    return timer(function, instance)
+
+
+def send_measurement(
+    sender, timer: Callable, function: Callable, instance: tuple
+) -> None:
+    """Send the measurement of `function` on `instance` through a pipe."""
+    sender.send(timer(function, instance))
+
+
+def measure_isolated(
+    timer: Callable, function: Callable, instance: tuple, timeout: float
+) -> tuple[float, float]:
+    """Return `timer(function, instance)`, computed in a forked process.
+
+    Stop the process and return a NaN run-time if it doesn't finish within
+    `timeout` seconds, unless zero, or if it stops unexpectedly.
+    """
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=send_measurement, args=(sender, timer, function, instance)
+    )
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(timeout or None):
+            return receiver.recv()
+    except EOFError:
+        pass  # the process crashed, e.g. ran out of memory
+    finally:
+        process.kill()
+        process.join()
+        receiver.close()
+    return math.nan, 0
+
+
+def measure_serially(
+    instances: Callable[[int], list[tuple[Callable | None, tuple]]],
+    sizes: list[int],
+    timer: Callable,
+) -> Iterator[tuple[float, float]]:
+    """Generate the run-time and precision of each function on its input, by size.
+
+    The `timer` is called with a function and its input, as a tuple.
+    If the function is None, it isn't timed and its run-time is NaN.
+    """
+    for size in sizes:
+        for function, instance in instances(size):
+            yield timer(function, instance) if function else (math.nan, 0)
+
+
+def measure_in_parallel(
+    instances: Callable[[int], list[tuple[Callable, tuple]]],
+    sizes: list[int],
+    timer: Callable,
+    cores: list[int],
+) -> Iterator[tuple[float, float]]:
+    """Like `measure_serially`, but with one worker process pinned to each core."""
+    global tasks
+    # forked workers use the tasks without copying them to the workers
+    tasks = [
+        (timer, function, instance)
+        for size in sizes
+        for function, instance in instances(size)
+    ]
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    for core in cores:
+        queue.put(core)
+    try:
+        with context.Pool(len(cores), pin_worker, (queue,)) as pool:
+            yield from pool.imap(time_task, range(len(tasks)))
+    finally:
+        tasks = []
+
+
+def measure_interleaved(
+    instances: Callable[[int], list[tuple[Callable | None, tuple]]],
+    sizes: list[int],
+    rounds: int,
+    precision: float = 0,
+    copy: bool = False,
+) -> Iterator[tuple[float, float]]:
+    """Generate the run-time and precision of each function on its input, by size.
+
+    Unlike `measure_serially`, take a sample of each run-time in each of `rounds`
+    rounds, in a random order, so that changes in the machine's speed, e.g.
+    due to heat or other processes, affect all run-times alike.
+    Each sample is of enough calls to take >= 0.05 seconds. The run-time is
+    the fastest sample or, if `precision` is positive, the mean of the samples
+    with its precision. All inputs are generated before timing.
+    If the function is None, it isn't timed and its run-time is NaN.
+    """
+    tasks = [task for size in sizes for task in instances(size)]
+    timers = [
+        loop_timer(function, instance, copy) if function else None
+        for function, instance in tasks
+    ]
+    loops = [calibrate(timer, 0.05)[0] if timer else 0 for timer in timers]
+    samples: list[list[float]] = [[] for _ in tasks]
+    order = [index for index, timer in enumerate(timers) if timer]
+    for _ in range(rounds):
+        random.shuffle(order)
+        for index in order:
+            samples[index].append(timers[index](loops[index]) / loops[index])
+    for index in range(len(tasks)):
+        if not samples[index]:
+            yield math.nan, 0
+        elif precision and rounds > 1:
+            yield mean_and_precision(samples[index])
+        else:
+            yield min(samples[index]), 0
+
+
+def merge_cached(
+    keys: dict[int, list[str]],
+    cached: dict[int, list[tuple[float, float] | None]],
+    run_times: Iterator[tuple[float, float]],
+) -> Iterator[tuple[float, float]]:
+    """Generate the cached run-times, by size, taking the missing ones from `run_times`.
+
+    Store each run-time taken from `run_times` in the cache, with its key.
+    """
+    for size in keys:
+        for key, result in zip(keys[size], cached[size]):
+            if result is None:
+                result = next(run_times)
+                if not math.isnan(result[0]):  # don't store skipped run-times
+                    set_cached(key, result)
+            yield result
+
+
+def measure(
+    instances: Callable[[int], list[tuple[Callable | None, tuple]]],
+    sizes: list[int],
+    workers: int,
+    precision: float = 0,
+    sources: list[tuple[Callable, Callable]] | None = None,
+    force: bool = False,
+    copy: bool = False,
+    isolate: bool = False,
+    timeout: float = 0,
+    baseline: bool = False,
+    interleave: int = 0,
+) -> Iterator[tuple[float, float]]:
+    """Return an iterator over the run-time of each function on its input, by size.
+
+    If `workers` is positive and there are at least that many free cores,
+    measure the run-times in parallel, with each worker process on its own core.
+    Otherwise, measure them one after the other in this process.
+    If `precision` is positive, each run-time is measured with `time_precisely`
+    and comes with its achieved precision, otherwise with `time_it` and zero.
+    If `sources` has, for each instance, the function and its input generator,
+    the run-times are reused from and stored in the cache (see `cache_timings`),
+    unless `force` is true, in which case they're only stored.
+    If `copy` is true, each call gets a fresh copy of its input.
+    If `isolate` is true, each run-time is measured in a new process, which is
+    stopped after `timeout` seconds, unless zero, giving a NaN run-time.
+    If `baseline` is true, the overhead of the timing loop is subtracted from
+    each run-time (see `loop_overhead`).
+    If `interleave` is positive, the run-times are measured together, in this
+    process, in that many rounds (see `measure_interleaved`), so `workers` and
+    `isolate` are ignored.
+    """
+    if precision:
+        settings: list = ["time_precisely", precision, copy, baseline, interleave]
+
+        def timer(function: Callable, instance: tuple) -> tuple[float, float]:
+            result = time_precisely(function, *instance, precision=precision, copy=copy)
+            return without_overhead(*result) if baseline else result
+
+    else:
+        # the default loops and repeat
+        settings = ["time_it", 0, 3, copy, baseline, interleave]
+
+        def timer(function: Callable, instance: tuple) -> tuple[float, float]:
+            result = time_it(function, *instance, copy=copy), 0
+            return without_overhead(*result) if baseline else result
+
+    if isolate:
+        measure_once = timer
+
+        def timer(function: Callable, instance: tuple) -> tuple[float, float]:
+            return measure_isolated(measure_once, function, instance, timeout)
+
+    if cache_dir and sources:
+        keys = {
+            size: [cache_key(*source, size, settings) for source in sources]
+            for size in sizes
+        }
+        cached = {
+            size: [None if force else get_cached(key) for key in keys[size]]
+            for size in sizes
+        }
+        uncached_sizes = [size for size in sizes if None in cached[size]]
+
+        def uncached(size: int) -> list[tuple[Callable, tuple]]:
+            """Return the instances of the given size that aren't cached."""
+            return [
+                instance
+                for instance, result in zip(instances(size), cached[size])
+                if result is None
+            ]
+
+        run_times = measure(
+            uncached,
+            uncached_sizes,
+            workers,
+            precision,
+            copy=copy,
+            isolate=isolate,
+            timeout=timeout,
+            baseline=baseline,
+            interleave=interleave,
+        )
+        return merge_cached(keys, cached, run_times)
+    if interleave:
+        run_times = measure_interleaved(instances, sizes, interleave, precision, copy)
+        if not baseline:
+            return run_times
+        return (without_overhead(*result) for result in run_times)
+    if not workers:
+        return measure_serially(instances, sizes, timer)
+    cores = sorted(free_cores())
+    if len(cores) < workers or "fork" not in multiprocessing.get_all_start_methods():
+        print(f"Warning: fewer than {workers} free cores, timing serially\n")
+        return measure_serially(instances, sizes, timer)
+    return measure_in_parallel(instances, sizes, timer, cores[:workers])
+
+
+def without_nan(values: np.ndarray) -> list:
+    """Return the values as a (nested) list, with None instead of NaN."""
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+class Timings:
+    """The run-times of some functions on inputs of increasing sizes.
+
+    Each column of the table of run-times has a label, e.g. the name of
+    the function or input case, and each row is for an input size.
+    The run-times are in seconds. If they were measured with `time_precisely`,
+    the metadata has the requested precision and the errors are the achieved
+    precisions, otherwise the errors are zero.
+    The run-times not measured, e.g. because a time budget ran out, are NaN.
+    If the peak memory used by each function was measured (see `peak_memory`),
+    it's in a table with the same layout, in bytes.
+    If the run-times were also sampled call by call (see `time_samples`),
+    `samples[label][size]` has the samples, or None if not taken.
+    If the steps executed were counted instead (see `count_steps`),
+    the table has the counts and the metadata's 'count' says what was counted.
+    In Jupyter, a `Timings` object is displayed as its tables and charts,
+    except when returned by the function that already showed them.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        labels: list[str],
+        sizes: list[int],
+        x_label: str = "Input size",
+        metadata: dict | None = None,
+    ) -> None:
+        """Create a table with no run-times for the given labels and sizes."""
+        self.title = title
+        self.labels = list(labels)
+        self.x_label = x_label
+        self.sizes = np.array(sizes)
+        # one row per label and one column per size, in seconds
+        self.times = np.full((len(labels), len(sizes)), np.nan)
+        self.errors = np.zeros((len(labels), len(sizes)))
+        self.memory: np.ndarray | None = None  # the peak bytes, if measured
+        self.samples: list[list[np.ndarray | None]] | None = None  # if sampled
+        # the labels not timed on larger inputs, with the reason
+        self.dropped: dict[str, str] = {}
+        self.metadata = dict(metadata or {})
+        self.shown = None  # the Jupyter cell that showed the table or chart
+
+    def add_size(self, size: int) -> int:
+        """Add `size` to the sizes, in order, with no run-times, and return its index."""
+        index = int(np.searchsorted(self.sizes, size))
+        self.sizes = np.insert(self.sizes, index, size)
+        self.times = np.insert(self.times, index, np.nan, axis=1)
+        self.errors = np.insert(self.errors, index, 0, axis=1)
+        return index
+
+    def scale_and_unit(self) -> tuple[int, str]:
+        """Return the scale factor and unit for the first run-time measured."""
+        if count := self.metadata.get("count"):
+            return 1, count
+        measured = self.times[~np.isnan(self.times)]
+        return scale_and_unit(measured[0] if len(measured) else 1)
+
+    @property
+    def unit(self) -> str:
+        """The unit used in the table and chart."""
+        return self.scale_and_unit()[1]
+
+    def header(self) -> str:
+        """Return the table's title and column headings."""
+        columns = "".join(f"{label[:15]:>15} " for label in self.labels)
+        return f"{self.title}\n\n{self.x_label} {columns}"
+
+    def cell(self, label: int, size: int) -> str:
+        """Return the table cell for the given label and size indices."""
+        run_time = self.times[label, size] * self.scale_and_unit()[0]
+        if math.isnan(run_time):
+            return f"{'-':>15}"
+        if self.metadata.get("count"):
+            return f"{run_time:>15.0f}"
+        if self.metadata.get("precision"):
+            return f"{run_time:>10.1f} {f'±{self.errors[label, size]:.0%}':<4}"
+        return f"{run_time:>15.1f}"
+
+    def table(self) -> str:
+        """Return the run-times as a text table, in the same unit."""
+        lines = [self.header()]
+        for size in range(len(self.sizes)):
+            cells = "".join(
+                self.cell(label, size) + " " for label in range(len(self.labels))
+            )
+            size_text = f"{self.sizes[size]:>{len(self.x_label)}}"
+            lines.append(f"{size_text} {cells}{self.unit}")
+        if notes := self.notes():
+            lines.extend(["", notes])
+        return "\n".join(lines)
+
+    def notes(self) -> str:
+        """Return the overhead subtracted and which functions weren't timed, and why."""
+        notes = []
+        if baseline := self.metadata.get("baseline"):
+            scale, unit = self.scale_and_unit()
+            notes.append(
+                f"The timing loop's overhead ({baseline * scale:.1f} {unit} per call) "
+                "was subtracted from the run-times."
+            )
+        for label, reason in self.dropped.items():
+            notes.append(f"{label} wasn't timed on larger inputs: {reason}")
+        return "\n".join(notes)
+
+    def chart(self) -> None:
+        """Plot the run-times, with error bars if their precisions are known."""
+        markers = ["bo-", "ko--", "ro:", "ys-", "cs--", "gs:"]
+        scale, unit = self.scale_and_unit()
+        plt.title(self.title)
+        plt.xlabel(self.x_label)
+        if self.metadata.get("count"):
+            plt.ylabel(f"Executed {unit}")
+        else:
+            plt.ylabel(f"Run-time ({unit})")
+        for index, label in enumerate(self.labels):
+            times = self.times[index] * scale
+            marker = markers[index % len(markers)]
+            if self.metadata.get("precision"):
+                errors = times * self.errors[index]
+                plt.errorbar(
+                    self.sizes, times, errors, fmt=marker, capsize=3, label=label
+                )
+            else:
+                plt.plot(self.sizes, times, marker, label=label)
+        plt.legend()
+        plt.show()
+
+    def memory_table(self) -> str:
+        """Return the peak memory used as a text table, in the same unit."""
+        scale, unit = memory_scale_and_unit(np.nanmax(self.memory))
+        columns = "".join(f"{label[:15]:>15} " for label in self.labels)
+        lines = [f"{self.title} (peak memory)\n\n{self.x_label} {columns}"]
+        for size in range(len(self.sizes)):
+            cells = "".join(
+                f"{'-':>15} " if math.isnan(peak) else f"{peak * scale:>15.1f} "
+                for peak in self.memory[:, size]
+            )
+            lines.append(f"{self.sizes[size]:>{len(self.x_label)}} {cells}{unit}")
+        return "\n".join(lines)
+
+    def memory_chart(self) -> None:
+        """Plot the peak memory used."""
+        markers = ["bo-", "ko--", "ro:", "ys-", "cs--", "gs:"]
+        scale, unit = memory_scale_and_unit(np.nanmax(self.memory))
+        plt.title(f"{self.title} (peak memory)")
+        plt.xlabel(self.x_label)
+        plt.ylabel(f"Peak memory ({unit})")
+        for index, label in enumerate(self.labels):
+            marker = markers[index % len(markers)]
+            plt.plot(self.sizes, self.memory[index] * scale, marker, label=label)
+        plt.legend()
+        plt.show()
+
+    def percentiles(self) -> np.ndarray:
+        """Return the `PERCENTILES` of the samples for each label and size, in seconds.
+
+        The array has one row per label, one column per size and one value per
+        percentile, which is NaN if the samples weren't taken.
+        """
+        table = np.full(self.times.shape + (len(PERCENTILES),), np.nan)
+        for label, row in enumerate(self.samples or []):
+            for size, samples in enumerate(row):
+                if samples is not None:
+                    table[label, size] = np.percentile(
+                        samples, list(PERCENTILES.values())
+                    )
+        return table
+
+    def distribution_table(self) -> str:
+        """Return the percentiles of the sampled run-times, one table per label."""
+        scale, unit = self.scale_and_unit()
+        percentiles = self.percentiles()
+        columns = "".join(f"{name:>10} " for name in PERCENTILES)
+        lines = [f"{self.title} (distribution of run-times)"]
+        for label in range(len(self.labels)):
+            lines.extend(["", self.labels[label], f"{self.x_label} {columns}"])
+            for size in range(len(self.sizes)):
+                cells = "".join(
+                    f"{'-':>10} " if math.isnan(value) else f"{value * scale:>10.1f} "
+                    for value in percentiles[label, size]
+                )
+                lines.append(f"{self.sizes[size]:>{len(self.x_label)}} {cells}{unit}")
+        return "\n".join(lines)
+
+    def distribution_chart(self) -> None:
+        """Plot the sampled run-times of each label as box plots, one per size.
+
+        The boxes span the middle half of the samples and the whiskers reach
+        the 1st and 99th percentiles. The samples beyond are shown as dots.
+        """
+        scale, unit = self.scale_and_unit()
+        for label, row in enumerate(self.samples or []):
+            sampled = [size for size, samples in enumerate(row) if samples is not None]
+            if not sampled:
+                continue
+            plt.title(f"{self.title}: {self.labels[label]}")
+            plt.xlabel(self.x_label)
+            plt.ylabel(f"Run-time per call ({unit})")
+            plt.boxplot([row[size] * scale for size in sampled], whis=(1, 99))
+            plt.xticks(range(1, len(sampled) + 1), self.sizes[sampled])
+            plt.yscale("log")
+            plt.show()
+
+    def to_dict(self) -> dict:
+        """Return the run-times and their description as a JSON-compatible dict."""
+        return {
+            "title": self.title,
+            "x_label": self.x_label,
+            "labels": self.labels,
+            "sizes": self.sizes.tolist(),
+            "times": without_nan(self.times),
+            "errors": self.errors.tolist(),
+            "memory": None if self.memory is None else without_nan(self.memory),
+            "percentiles": (
+                None if self.samples is None else without_nan(self.percentiles())
+            ),
+            "dropped": self.dropped,
+            "metadata": self.metadata,
+        }
+
+    def to_json(self, path: str) -> None:
+        """Write the run-times and their description to a JSON file."""
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+    def to_csv(self, path: str) -> None:
+        """Write the run-times, in seconds, to a CSV file with one row per size.
+
+        If the peak memory was measured, it follows the run-times, in bytes.
+        Values not measured are left empty.
+        """
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            header = [self.x_label] + self.labels
+            if self.memory is not None:
+                header += [f"{label} (peak memory)" for label in self.labels]
+            writer.writerow(header)
+            for size in range(len(self.sizes)):
+                row = [self.sizes[size]] + without_nan(self.times[:, size])
+                if self.memory is not None:
+                    row += without_nan(self.memory[:, size])
+                writer.writerow(row)
+
+    def __repr__(self) -> str:
+        """Return the table of run-times, followed by the other tables measured."""
+        tables = [self.table()]
+        if self.memory is not None:
+            tables.append(self.memory_table())
+        if self.samples is not None:
+            tables.append(self.distribution_table())
+        return "\n\n".join(tables)
+
+    def _ipython_display_(self) -> None:
+        """Show the tables and charts, unless the current cell already showed them."""
+        if self.shown != get_ipython().execution_count:
+            print(repr(self))
+            self.chart()
+            if self.memory is not None:
+                self.memory_chart()
+            if self.samples is not None:
+                self.distribution_chart()
+
+
+# the extra seconds an isolated measurement may take, e.g. to calibrate the loops
+ISOLATE_MARGIN = 2
+# the same, when the mean run-time is measured with `time_precisely`
+ISOLATE_PRECISELY = 6
+
+
+def over_budget(
+    run_times: np.ndarray,
+    sizes: np.ndarray,
+    index: int,
+    calls: int,
+    timeout: float,
+    left: float,
+) -> str:
+    """Return why a function mustn't be timed on larger inputs, or the empty string.
+
+    The function's `run_times` for the `sizes` are known up to the given `index`.
+    A measurement calls the function at least `calls` times, which may take up to
+    `timeout` seconds for each measurement and `left` seconds for all remaining
+    measurements, unless zero. The time for the next size is projected from
+    the growth of the last run-times. The time taken by the timing loop itself,
+    e.g. to calibrate the number of loops, isn't included.
+    """
+    run_time = run_times[index]
+    if timeout and calls * run_time > timeout:
+        return f"it took {calls * run_time:.3g} s"
+    if index == 0 or index + 1 == len(sizes) or not timeout and not left:
+        return ""
+    previous = run_times[index - 1]
+    if math.isnan(previous) or not 0 < previous < run_time:
+        growth = 1.0
+    else:
+        exponent = math.log(run_time / previous) / math.log(
+            sizes[index] / sizes[index - 1]
+        )
+        growth = (sizes[index + 1] / sizes[index]) ** exponent
+    projected = calls * run_time * growth
+    if timeout and projected > timeout:
+        return f"it would take about {projected:.3g} s"
+    if left and projected > left:
+        return f"it would take about {projected:.3g} s, more than the {left:.3g} s left"
+    return ""
+
+
+def time_table(
+    title: str,
+    labels: list[str],
+    instances: Callable[[int], list[tuple[Callable, tuple]]],
+    sizes: list[int],
+    x_label: str,
+    text: bool,
+    chart: bool,
+    workers: int = 0,
+    precision: float = 0,
+    sources: list[tuple[Callable, Callable]] | None = None,
+    force: bool = False,
+    copy: bool = False,
+    memory: bool = False,
+    timeout: float = 0,
+    total_timeout: float = 0,
+    isolate: bool = False,
+    adaptive: int = 0,
+    baseline: bool = False,
+    interleave: int = 0,
+    samples: int = 0,
+) -> Timings:
+    """Measure, print or plot the run-times of some functions on inputs of given sizes.
+
+    `instances(size)` returns, for each label, the function to time and its input.
+    If `workers` is positive, the run-times are measured in parallel by that many
+    processes, each pinned to its own CPU core. This is only possible on Linux
+    and if there are enough cores not busy with other work; otherwise
+    the run-times are measured one after the other.
+    If `precision` is positive, the mean run-times are measured with
+    `time_precisely` and shown with their achieved precision.
+    If `sources` has, for each label, the function and its input generator, the
+    run-times are reused from the cache, if enabled with `cache_timings`, unless
+    `force` is true. If `copy` is true, each call gets a fresh copy of its input.
+    The run-times are printed as they're measured, if `text` is true.
+    If `memory` is true, the peak memory used by each call is measured afterwards,
+    in a separate pass, so that tracing the memory doesn't slow down the timing.
+
+    If `timeout` is positive, a function isn't timed on larger inputs once the calls
+    needed to measure its run-time take, or are projected to take, more than
+    `timeout` seconds.
+    If `total_timeout` is positive, functions aren't timed on larger inputs once
+    they're projected to exceed it, and no function is timed after it's reached.
+    The budgets apply to the function's calls: the timing loop takes at least about
+    a second more for each measurement, e.g. to calibrate the number of loops.
+    If `isolate` is true, each run-time is measured in a new process, which is
+    stopped after `timeout` seconds, or `total_timeout` if no timeout is given,
+    plus `ISOLATE_MARGIN` seconds, or `ISOLATE_PRECISELY` if `precision` is given.
+    The run-times not measured are NaN and shown as gaps. Time budgets and `isolate`
+    need the run-times to be measured one after the other, so `workers` is then
+    ignored.
+
+    If `adaptive` is positive, up to that many sizes are then added, one by one,
+    where the growth of the run-times changes most (see `adaptive_size`).
+    They're printed after the other sizes but kept in order in the `Timings`.
+
+    If `baseline` is true, the overhead of the timing loop, measured beforehand
+    on an empty loop, is subtracted from each run-time and shown after the table.
+
+    If `interleave` is positive, all run-times are measured together in that many
+    rounds, each in a random order, and printed at the end (see `measure`).
+    Time budgets need the run-times to be measured one after the other,
+    so `interleave` is then ignored.
+
+    If `samples` is positive, up to that many run-times per call are then sampled
+    for each function and size, in a separate pass (see `time_samples`),
+    and their distribution is shown in tables and box plots. Each sample
+    times enough calls to take at least `SAMPLE_TIME` seconds, and each
+    function and size is sampled for about a second at most.
+    The run-times in the main table are still the fastest ones measured.
+    """
+    if isolate and "fork" not in multiprocessing.get_all_start_methods():
+        print("Warning: can't time in separate processes on this platform\n")
+        isolate = False
+    if (timeout or total_timeout) and workers:
+        print("Warning: timing serially, to keep within the time budget\n")
+        workers = 0
+    elif isolate and workers:
+        # the workers are daemonic processes, which can't start other processes
+        print("Warning: timing serially, to time in separate processes\n")
+        workers = 0
+    if (timeout or total_timeout) and interleave:
+        print("Warning: not interleaving, to keep within the time budget\n")
+        interleave = 0
+    metadata = {
+        "workers": workers,
+        "precision": precision,
+        "copy": copy,
+        "timeout": timeout,
+        "total_timeout": total_timeout,
+        "isolate": isolate,
+        "adaptive": adaptive,
+        "baseline": loop_overhead() if baseline else 0,
+        "interleave": interleave,
+        "samples": samples,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    timings = Timings(title, labels, sizes, x_label, metadata)
+    dropped: dict[int, str] = {}  # the labels not to time further, with the reason
+    # an isolated measurement also needs time to calibrate and repeat the loops
+    limit = timeout or total_timeout
+    stop = limit and limit + (ISOLATE_PRECISELY if precision else ISOLATE_MARGIN)
+    start = timeit.default_timer()
+
+    def remaining(size: int) -> list[tuple[Callable | None, tuple]]:
+        """Return the instances of the given size, with None for dropped functions."""
+        if total_timeout and timeit.default_timer() - start > total_timeout:
+            for label in range(len(labels)):
+                dropped.setdefault(label, "the time budget ran out")
+        if len(dropped) == len(labels):
+            return [(None, ())] * len(labels)  # don't generate the inputs
+        return [
+            (None, ()) if label in dropped else instance
+            for label, instance in enumerate(instances(size))
+        ]
+
+    def time_sizes(indices: list[int]) -> None:
+        """Measure and print the run-times for the sizes with the given indices."""
+        run_times = measure(
+            remaining,
+            [int(timings.sizes[size]) for size in indices],
+            workers,
+            precision,
+            sources,
+            force,
+            copy,
+            isolate,
+            stop,
+            baseline,
+            interleave,
+        )
+        for size in indices:
+            if text:
+                print(f"\n{timings.sizes[size]:>{len(x_label)}}", end=" ")
+            for label in range(len(labels)):
+                before = timeit.default_timer()
+                result = next(run_times)
+                timings.times[label, size], timings.errors[label, size] = result
+                seconds = timeit.default_timer() - before  # including the loop
+                if (timeout or total_timeout or isolate) and label not in dropped:
+                    left = total_timeout - (timeit.default_timer() - start)
+                    calls = 6 if precision else 3
+                    times = timings.times[label]
+                    if math.isnan(timings.times[label, size]):
+                        reason = f"it didn't finish within {stop:.3g} s"
+                        if not stop or seconds < stop:
+                            reason = "it stopped unexpectedly"
+                    elif total_timeout and left <= 0:
+                        reason = "the time budget ran out"
+                    else:
+                        reason = over_budget(
+                            times,
+                            timings.sizes,
+                            size,
+                            calls,
+                            timeout,
+                            max(left, 0),
+                        )
+                    if reason:
+                        dropped[label] = reason
+                        timings.dropped[labels[label]] = reason
+                if text:
+                    print(timings.cell(label, size), end=" ")
+            if text:
+                print(timings.unit, end="")
+
+    if text:
+        print(timings.header(), end="")
+    time_sizes(list(range(len(sizes))))
+    if adaptive and text:
+        print("\n\nSizes added where the run-times' growth changes most:", end="")
+    for _ in range(adaptive):
+        size = adaptive_size(timings.sizes, timings.times)
+        if size is None or len(dropped) == len(labels):
+            break
+        time_sizes([timings.add_size(size)])
+    if text and (notes := timings.notes()):
+        print(f"\n\n{notes}", end="")
+    if memory:
+        timings.memory = np.full(timings.times.shape, np.nan)
+        for size in range(len(timings.sizes)):
+            if np.isnan(timings.times[:, size]).all():
+                continue  # don't generate the inputs
+            inputs = instances(int(timings.sizes[size]))
+            for label, (function, instance) in enumerate(inputs):
+                if not math.isnan(timings.times[label, size]):
+                    peak = peak_memory(function, *instance, copy=copy)
+                    timings.memory[label, size] = peak
+        if text:
+            print(f"\n\n{timings.memory_table()}", end="")
+    if samples:
+        timings.samples = [[None] * len(timings.sizes) for _ in labels]
+        for size in range(len(timings.sizes)):
+            if np.isnan(timings.times[:, size]).all():
+                continue  # don't generate the inputs
+            inputs = instances(int(timings.sizes[size]))
+            for label, (function, instance) in enumerate(inputs):
+                run_time = timings.times[label, size]
+                if not math.isnan(run_time):
+                    call = max(run_time, 1e-9)  # the baseline may leave zero
+                    batch = math.ceil(SAMPLE_TIME / call)
+                    count = max(min(samples, int(1 / (batch * call))), 1)
+                    timings.samples[label][size] = time_samples(
+                        function, *instance, samples=count, batch=batch, copy=copy
+                    )
+        if text:
+            print(f"\n\n{timings.distribution_table()}", end="")
+    if chart:
+        timings.chart()
+        if memory:
+            timings.memory_chart()
+        if samples:
+            timings.distribution_chart()
+    if ipython := get_ipython():
+        timings.shown = ipython.execution_count
+    return timings
+
+
 def time_cases(
     function: Callable,
     cases: list[Callable],
-    start: int,
-    double: int,
+    start: int = 1,
+    double: int = 10,
     text: bool = True,
     chart: bool = False,
-) -> None:
-    """Print or plot the run-times of `function` for different input cases.
+    workers: int = 0,
+    precision: float = 0,
+    force: bool = False,
+    copy: bool = False,
+    memory: bool = False,
+    timeout: float = 0,
+    total_timeout: float = 0,
+    isolate: bool = False,
+    sizes: list[int] | None = None,
+    factor: float = 2,
+    step: int = 0,
+    adaptive: int = 0,
+    baseline: bool = False,
+    interleave: int = 0,
+    samples: int = 0,
+) -> Timings:
+    """Measure, print or plot the run-times of `function` for different input cases.
 
-    `time_cases` prints or plots the run-times of a single function using a list of
-    different input generators. Inputs are generated based on a starting size and are
-    doubled a specified number of times.
+    `time_cases` measures, prints or plots the run-times of a single function using
+    a list of different input generators. Inputs are generated based on a starting
+    size and are doubled a specified number of times.
 
     Args:
         function (Callable): A function whose run-times will be measured.
@@ -70,6 +1331,48 @@ def time_cases(
         double (int): The number of times to double the input size. Must be non-negative.
         text (bool, optional): If True, print the run-times in text format.
         chart (bool, optional): If True, plot the run-times using a chart.
+        workers (int, optional): If positive, the number of processes that measure
+            the run-times in parallel, each on its own CPU core (see `time_table`).
+        precision (float, optional): If positive, measure the mean run-times until
+            they are within ±`precision` (e.g. 0.05 for 5%) with 95% confidence,
+            and show the achieved precision (see `time_precisely`).
+        force (bool, optional): If True, measure the run-times even if they're cached
+            (see `cache_timings`).
+        copy (bool, optional): If True, call the function on a fresh copy of
+            the input each time, e.g. if it sorts the input in-place.
+            The copies aren't timed.
+        memory (bool, optional): If True, also measure the peak memory used by
+            each call, after the run-times, and show it in a separate table and chart.
+        timeout (float, optional): If positive, stop timing a function on larger
+            inputs once the calls needed to measure its run-time take, or are
+            projected to take, more than this many seconds.
+        total_timeout (float, optional): If positive, stop timing the functions
+            on larger inputs once they're projected to exceed this many seconds
+            in total. The run-times not measured are shown as gaps.
+        isolate (bool, optional): If True, measure each run-time in a new process,
+            stopped after `timeout` seconds, or `total_timeout` if no timeout,
+            plus a margin for the timing loop (see `time_table`).
+        sizes (list[int] | None, optional): If given, the increasing input sizes
+            to use instead of `start` and `double`.
+        factor (float, optional): The factor by which to multiply the input size
+            `double` times, instead of doubling it. Must be more than 1.
+        step (int, optional): If positive, add `step` to the input size `double`
+            times, instead of multiplying it.
+        adaptive (int, optional): The number of sizes to add after timing the others,
+            between the sizes where the growth of the run-times changes most.
+        baseline (bool, optional): If True, subtract the overhead of the timing loop,
+            measured on an empty loop, from the run-times and show it.
+        interleave (int, optional): If positive, measure all run-times together in
+            this many rounds (e.g. 10), each in a random order, so that changes
+            in the machine's speed don't favour any function. The run-times
+            are printed at the end.
+        samples (int, optional): If positive, also sample up to this many
+            run-times per call (e.g. 1000) for each input, after the run-times,
+            and show their min, median, 90th and 99th percentiles and max
+            in separate tables and box plots, to reveal occasional slow calls.
+
+    Returns:
+        Timings: The run-times, e.g. to export them with `to_csv` or `to_json`.
 
     Raises:
         AssertionError: If input conditions are not satisfied.
@@ -77,61 +1380,75 @@ def time_cases(
     assert start > 0, "the start size must be positive"
     assert double >= 0, "must double the input size at least zero times"
     assert 0 < len(cases) < 7, "there must be 1 to 6 input functions"
-    assert text or chart, "at least one of text and chart must be enabled"
+    assert workers >= 0, "the number of workers must be non-negative"
+    assert precision >= 0, "the precision must be non-negative"
+    assert timeout >= 0, "the timeout must be non-negative"
+    assert total_timeout >= 0, "the total timeout must be non-negative"
+    assert (
+        sizes is None or sizes and sizes == sorted(set(sizes)) and sizes[0] > 0
+    ), "the sizes must be positive and increasing"
+    assert factor > 1, "the factor must be more than 1"
+    assert step >= 0, "the step must be non-negative"
+    assert adaptive >= 0, "the number of adaptive sizes must be non-negative"
+    assert interleave >= 0, "the number of rounds must be non-negative"
+    assert samples >= 0, "the number of samples must be non-negative"
 
-    sizes = [start]  # the input sizes used
-    for _ in range(double):
-        sizes.append(sizes[-1] * 2)
-    scale = unit = None  # no scale determined yet
-    if chart:
-        markers = ["bo-", "ko--", "ro:", "ys-", "cs--", "gs:"]
-        times: list[list[float]] = []
-        for _ in range(len(cases)):
-            times.append([])
-        plt.title(f"Run-times for {function.__name__}")
-    if text:
-        print(f"Run-times for {function.__name__}\n")
-        print("Input size", end=" ")
-        for case in cases:
-            print(f"{case.__name__[:15]:>15}", end=" ")
-    for size in sizes:
-        if text:
-            print(f"\n{size:>10}", end=" ")
-        for index in range(len(cases)):
-            instance = cases[index](size)
-            run_time = time_it(function, *instance)
-            if not scale:
-                scale, unit = scale_and_unit(run_time)
-            run_time = run_time * scale
-            if chart:
-                times[index].append(run_time)
-            if text:
-                print(f"{run_time:>15.1f}", end=" ")
-        if text:
-            print(f"{unit}", end="")
-    if chart:
-        plt.xlabel("Input size")
-        plt.ylabel(f"Run-time ({unit})")
-        for index in range(len(cases)):
-            plt.plot(sizes, times[index], markers[index], label=cases[index].__name__)
-        plt.legend()
-        plt.show()
+    def instances(size: int) -> list[tuple[Callable, tuple]]:
+        return [(function, case(size)) for case in cases]
+
+    return time_table(
+        f"Run-times for {function.__name__}",
+        [case.__name__ for case in cases],
+        instances,
+        sizes or schedule_sizes(start, double, factor, step),
+        "Input size",
+        text,
+        chart,
+        workers,
+        precision,
+        [(function, case) for case in cases],
+        force,
+        copy,
+        memory,
+        timeout,
+        total_timeout,
+        isolate,
+        adaptive,
+        baseline,
+        interleave,
+        samples,
+    )
 
 
 def time_functions(
     functions: list[Callable],
     inputs: Callable,
-    start: int,
-    double: int,
+    start: int = 1,
+    double: int = 10,
     text: bool = True,
     chart: bool = False,
     value: bool = False,
-) -> None:
-    """Print or plot the run-times of different functions for the same inputs.
+    workers: int = 0,
+    precision: float = 0,
+    force: bool = False,
+    copy: bool = False,
+    memory: bool = False,
+    timeout: float = 0,
+    total_timeout: float = 0,
+    isolate: bool = False,
+    sizes: list[int] | None = None,
+    factor: float = 2,
+    step: int = 0,
+    adaptive: int = 0,
+    baseline: bool = False,
+    interleave: int = 0,
+    samples: int = 0,
+) -> Timings:
+    """Measure, print or plot the run-times of different functions for the same inputs.
 
-    `time_functions` prints or plots the run-times given list of functions and an input
-    generator. Inputs are generated based on a starting size and are doubled a specified
-    number of times.
+    `time_functions` measures, prints or plots the run-times given list of functions
+    and an input generator. Inputs are generated based on a starting size and are
+    doubled a specified number of times.
 
     Args:
         functions (list[Callable]): A list of functions whose run-times will be measured.
@@ -142,6 +1459,48 @@ def time_functions(
         text (bool, optional): If True, print the run-times in text format
         chart (bool, optional): If True plot the run-times using a chart.
         value (bool, optional): If True x-axis is labelled "Input value" otherwise "Input size".
+        workers (int, optional): If positive, the number of processes that measure
+            the run-times in parallel, each on its own CPU core (see `time_table`).
+        precision (float, optional): If positive, measure the mean run-times until
+            they are within ±`precision` (e.g. 0.05 for 5%) with 95% confidence,
+            and show the achieved precision (see `time_precisely`).
+        force (bool, optional): If True, measure the run-times even if they're cached
+            (see `cache_timings`).
+        copy (bool, optional): If True, call the functions on a fresh copy of
+            the input each time, e.g. for functions that sort the input in-place.
+            The copies aren't timed.
+        memory (bool, optional): If True, also measure the peak memory used by
+            each call, after the run-times, and show it in a separate table and chart.
+        timeout (float, optional): If positive, stop timing a function on larger
+            inputs once the calls needed to measure its run-time take, or are
+            projected to take, more than this many seconds.
+        total_timeout (float, optional): If positive, stop timing the functions
+            on larger inputs once they're projected to exceed this many seconds
+            in total. The run-times not measured are shown as gaps.
+        isolate (bool, optional): If True, measure each run-time in a new process,
+            stopped after `timeout` seconds, or `total_timeout` if no timeout,
+            plus a margin for the timing loop (see `time_table`).
+        sizes (list[int] | None, optional): If given, the increasing input sizes
+            to use instead of `start` and `double`.
+        factor (float, optional): The factor by which to multiply the input size
+            `double` times, instead of doubling it. Must be more than 1.
+        step (int, optional): If positive, add `step` to the input size `double`
+            times, instead of multiplying it.
+        adaptive (int, optional): The number of sizes to add after timing the others,
+            between the sizes where the growth of the run-times changes most.
+        baseline (bool, optional): If True, subtract the overhead of the timing loop,
+            measured on an empty loop, from the run-times and show it.
+        interleave (int, optional): If positive, measure all run-times together in
+            this many rounds (e.g. 10), each in a random order, so that changes
+            in the machine's speed don't favour any function. The run-times
+            are printed at the end.
+        samples (int, optional): If positive, also sample up to this many
+            run-times per call (e.g. 1000) for each input, after the run-times,
+            and show their min, median, 90th and 99th percentiles and max
+            in separate tables and box plots, to reveal occasional slow calls.
+
+    Returns:
+        Timings: The run-times, e.g. to export them with `to_csv` or `to_json`.
 
     Raises:
         AssertionError: If input conditions are not satisfied.
@@ -149,49 +1508,45 @@ def time_functions(
     assert start > 0, "the start size/value can't be negative"
     assert double >= 0, "must double the input size/value at least zero times"
     assert 0 < len(functions) < 7, "there must be 1 to 6 functions"
-    assert text or chart, "at least one of text and chart must be enabled"
+    assert workers >= 0, "the number of workers must be non-negative"
+    assert precision >= 0, "the precision must be non-negative"
+    assert timeout >= 0, "the timeout must be non-negative"
+    assert total_timeout >= 0, "the total timeout must be non-negative"
+    assert (
+        sizes is None or sizes and sizes == sorted(set(sizes)) and sizes[0] > 0
+    ), "the sizes must be positive and increasing"
+    assert factor > 1, "the factor must be more than 1"
+    assert step >= 0, "the step must be non-negative"
+    assert adaptive >= 0, "the number of adaptive sizes must be non-negative"
+    assert interleave >= 0, "the number of rounds must be non-negative"
+    assert samples >= 0, "the number of samples must be non-negative"
 
-    x_label = "Input " + ("value" if value else "size")
-    text_width = len(x_label)
-    sizes = [start]  # the input sizes used
-    for _ in range(double):
-        sizes.append(sizes[-1] * 2)
-    scale = unit = None  # no scale determined yet
-    if chart:
-        markers = ["bo-", "ko--", "ro:", "ys-", "cs--", "gs:"]
-        times: list[list[float]] = []
-        for _ in range(len(functions)):
-            times.append([])
-        plt.title(f"Inputs generated by {inputs.__name__}")
-    if text:
-        print(f"Inputs generated by {inputs.__name__}\n")
-        print(x_label, end=" ")
-        for index in range(len(functions)):
-            print(f"{functions[index].__name__[:15]:>15}", end=" ")
-    for size in sizes:
-        if text:
-            print(f"\n{size:>{text_width}}", end=" ")
-        instance = inputs(size)
-        for index in range(len(functions)):
-            run_time = time_it(functions[index], *instance)
-            if not scale:
-                scale, unit = scale_and_unit(run_time)
-            run_time = run_time * scale
-            if chart:
-                times[index].append(run_time)
-            if text:
-                print(f"{run_time:>15.1f}", end=" ")
-        if text:
-            print(f"{unit}", end="")
-    if chart:
-        plt.xlabel(x_label)
-        plt.ylabel(f"Run-time ({unit})")
-        for index in range(len(functions)):
-            plt.plot(
-                sizes, times[index], markers[index], label=functions[index].__name__
-            )
-        plt.legend()
-        plt.show()
+    def instances(size: int) -> list[tuple[Callable, tuple]]:
+        instance = inputs(size)  # all functions get the same input
+        return [(function, instance) for function in functions]
+
+    return time_table(
+        f"Inputs generated by {inputs.__name__}",
+        [function.__name__ for function in functions],
+        instances,
+        sizes or schedule_sizes(start, double, factor, step),
+        "Input " + ("value" if value else "size"),
+        text,
+        chart,
+        workers,
+        precision,
+        [(function, inputs) for function in functions],
+        force,
+        copy,
+        memory,
+        timeout,
+        total_timeout,
+        isolate,
+        adaptive,
+        baseline,
+        interleave,
+        samples,
+    )
 
 
 def time_functions_int(
@@ -201,7 +1556,21 @@ def time_functions_int(
     double: int = 10,
     text: bool = True,
     chart: bool = True,
-) -> None:
+    workers: int = 0,
+    precision: float = 0,
+    force: bool = False,
+    memory: bool = False,
+    timeout: float = 0,
+    total_timeout: float = 0,
+    isolate: bool = False,
+    sizes: list[int] | None = None,
+    factor: float = 2,
+    step: int = 0,
+    adaptive: int = 0,
+    baseline: bool = False,
+    interleave: int = 0,
+    samples: int = 0,
+) -> Timings:
     """Time functions that take a single integer as input.
 
     `time_functions_int` uses `time_functions` to measure and display the run-times
@@ -220,5 +1589,596 @@ def time_functions_int(
             Defaults to 10. Must be non-negative.
         text (bool, optional): If True, print the run-times in text format.
         chart (bool, optional): If True, plot the run-times using a chart.
+        workers (int, optional): If positive, the number of processes that measure
+            the run-times in parallel, each on its own CPU core (see `time_table`).
+        precision (float, optional): If positive, measure the mean run-times until
+            they are within ±`precision` (e.g. 0.05 for 5%) with 95% confidence,
+            and show the achieved precision (see `time_precisely`).
+        force (bool, optional): If True, measure the run-times even if they're cached
+            (see `cache_timings`).
+        memory (bool, optional): If True, also measure the peak memory used by
+            each call, after the run-times, and show it in a separate table and chart.
+        timeout (float, optional): If positive, stop timing a function on larger
+            inputs once the calls needed to measure its run-time take, or are
+            projected to take, more than this many seconds.
+        total_timeout (float, optional): If positive, stop timing the functions
+            on larger inputs once they're projected to exceed this many seconds
+            in total. The run-times not measured are shown as gaps.
+        isolate (bool, optional): If True, measure each run-time in a new process,
+            stopped after `timeout` seconds, or `total_timeout` if no timeout,
+            plus a margin for the timing loop (see `time_table`).
+        sizes (list[int] | None, optional): If given, the increasing input sizes
+            to use instead of `start` and `double`.
+        factor (float, optional): The factor by which to multiply the input size
+            `double` times, instead of doubling it. Must be more than 1.
+        step (int, optional): If positive, add `step` to the input size `double`
+            times, instead of multiplying it.
+        adaptive (int, optional): The number of sizes to add after timing the others,
+            between the sizes where the growth of the run-times changes most.
+        baseline (bool, optional): If True, subtract the overhead of the timing loop,
+            measured on an empty loop, from the run-times and show it.
+        interleave (int, optional): If positive, measure all run-times together in
+            this many rounds (e.g. 10), each in a random order, so that changes
+            in the machine's speed don't favour any function. The run-times
+            are printed at the end.
+        samples (int, optional): If positive, also sample up to this many
+            run-times per call (e.g. 1000) for each input, after the run-times,
+            and show their min, median, 90th and 99th percentiles and max
+            in separate tables and box plots, to reveal occasional slow calls.
+
+    Returns:
+        Timings: The run-times, e.g. to export them with `to_csv` or `to_json`.
+    """
+    return time_functions(
+        functions,
+        generator,
+        start,
+        double,
+        text,
+        chart,
+        True,
+        workers,
+        precision,
+        force,
+        memory=memory,
+        timeout=timeout,
+        total_timeout=total_timeout,
+        isolate=isolate,
+        sizes=sizes,
+        factor=factor,
+        step=step,
+        adaptive=adaptive,
+        baseline=baseline,
+        interleave=interleave,
+        samples=samples,
+    )
+
+
+# Step counting
+# -------------
+
+
+def count_steps(function: Callable, *args, opcodes: bool = False, copy=False) -> int:
+    """Return the number of lines of Python code executed by calling `function`.
+
+    The lines executed by the functions that `function` calls are included,
+    except for built-in functions and others not written in Python.
+    If `opcodes` is true, count the bytecode instructions executed instead.
+    Unlike run-times, the counts don't depend on the machine, but may change with
+    the Python version. Only the lines run by the calling thread are counted. The code is instrumented with `sys.monitoring`
+    on Python 3.12 and later, and with `sys.settrace` otherwise.
+    If `copy` is true, the function is called on a copy of the input,
+    made before counting.
     """
-    time_functions(functions, generator, start, double, text, chart, True)
+    if copy:
+        args = deepcopy(args)
+    count = 0
+    if hasattr(sys, "monitoring"):
+        monitoring = sys.monitoring
+        event = monitoring.events.INSTRUCTION if opcodes else monitoring.events.LINE
+        tools = [tool for tool in range(6) if monitoring.get_tool(tool) is None]
+        assert tools, "all sys.monitoring tools are in use"
+
+        caller = threading.get_ident()
+
+        def counter(code, _) -> None:
+            nonlocal count
+            # the events are for all threads; skip the lines after the call
+            if threading.get_ident() == caller and code is not count_steps.__code__:
+                count += 1
+
+        monitoring.use_tool_id(tools[0], "algoesup")
+        monitoring.register_callback(tools[0], event, counter)
+        monitoring.set_events(tools[0], event)
+        try:
+            function(*args)
+        finally:
+            monitoring.set_events(tools[0], 0)
+            monitoring.register_callback(tools[0], event, None)
+            monitoring.free_tool_id(tools[0])
+        return count
+
+    def trace(frame, event: str, _) -> Callable:
+        """Trace the lines or opcodes of each new frame."""
+        nonlocal count
+        if event == "call" and opcodes:
+            frame.f_trace_lines = False
+            frame.f_trace_opcodes = True
+        elif event == ("opcode" if opcodes else "line"):
+            count += 1
+        return trace
+
+    previous = sys.gettrace()
+    sys.settrace(trace)
+    try:
+        function(*args)
+    finally:
+        sys.settrace(previous)
+    return count
+
+
+def count_functions(
+    functions: list[Callable],
+    inputs: Callable,
+    start: int = 1,
+    double: int = 10,
+    text: bool = True,
+    chart: bool = False,
+    value: bool = False,
+    copy: bool = False,
+    opcodes: bool = False,
+    sizes: list[int] | None = None,
+    factor: float = 2,
+    step: int = 0,
+) -> Timings:
+    """Count and show the lines executed by different functions for the same inputs.
+
+    `count_functions` is like `time_functions`, but counts the lines of Python
+    code executed by each function, or the bytecode instructions, instead of timing
+    it (see `count_steps`). The counts can be compared across machines and
+    are the same each time, but calls of built-in functions count as one step,
+    however long they take.
+
+    Args:
+        functions (list[Callable]): A list of functions whose steps will be counted.
+            Must be 1 to 6 functions.
+        inputs (Callable): A function to generate inputs when given a specific size.
+        start (int): The starting size for the inputs. Must be positive.
+        double (int): The number of times to double the input size. Must be non-negative.
+        text (bool, optional): If True, print the counts in text format.
+        chart (bool, optional): If True, plot the counts using a chart.
+        value (bool, optional): If True x-axis is labelled "Input value" otherwise "Input size".
+        copy (bool, optional): If True, call the functions on a fresh copy of
+            the input each time, e.g. for functions that sort the input in-place.
+        opcodes (bool, optional): If True, count the bytecode instructions executed
+            instead of the lines.
+        sizes (list[int] | None, optional): If given, the increasing input sizes
+            to use instead of `start` and `double`.
+        factor (float, optional): The factor by which to multiply the input size
+            `double` times, instead of doubling it. Must be more than 1.
+        step (int, optional): If positive, add `step` to the input size `double`
+            times, instead of multiplying it.
+
+    Returns:
+        Timings: The counts, in the `times` attribute, e.g. to export them.
+
+    Raises:
+        AssertionError: If input conditions are not satisfied.
+    """
+    assert start > 0, "the start size/value can't be negative"
+    assert double >= 0, "must double the input size/value at least zero times"
+    assert 0 < len(functions) < 7, "there must be 1 to 6 functions"
+    assert (
+        sizes is None or sizes and sizes == sorted(set(sizes)) and sizes[0] > 0
+    ), "the sizes must be positive and increasing"
+    assert factor > 1, "the factor must be more than 1"
+    assert step >= 0, "the step must be non-negative"
+
+    x_label = "Input " + ("value" if value else "size")
+    metadata = {
+        "count": "instructions" if opcodes else "lines",
+        "copy": copy,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    timings = Timings(
+        f"Inputs generated by {inputs.__name__}",
+        [function.__name__ for function in functions],
+        sizes or schedule_sizes(start, double, factor, step),
+        x_label,
+        metadata,
+    )
+    if text:
+        print(timings.header(), end="")
+    for size in range(len(timings.sizes)):
+        if text:
+            print(f"\n{timings.sizes[size]:>{len(x_label)}}", end=" ")
+        instance = inputs(int(timings.sizes[size]))  # all functions get the same input
+        for label, function in enumerate(functions):
+            steps = count_steps(function, *instance, opcodes=opcodes, copy=copy)
+            timings.times[label, size] = steps
+            if text:
+                print(timings.cell(label, size), end=" ")
+        if text:
+            print(timings.unit, end="")
+    if chart:
+        timings.chart()
+    if ipython := get_ipython():
+        timings.shown = ipython.execution_count
+    return timings
+
+
+# Complexity estimation
+# ---------------------
+
+# the growth of the run-time with the input size n for each complexity class
+COMPLEXITIES: dict[str, Callable] = {
+    "1": np.ones_like,
+    "log n": np.log2,
+    "n": lambda n: n,
+    "n log n": lambda n: n * np.log2(n),
+    "n²": lambda n: n**2,
+    "n³": lambda n: n**3,
+    "2ⁿ": np.exp2,
+}
+
+
+class Complexity(NamedTuple):
+    """A complexity class fitted to run-times: time ≈ constant + factor*growth(n)."""
+
+    name: str  #: the complexity class, e.g. 'n log n'
+    constant: float  #: in seconds
+    factor: float  #: in seconds
+    error: float  #: the root mean square of the relative errors of the fitted times
+    r2: float  #: the coefficient of determination of the fitted times
+
+    def __call__(self, n):
+        """Return the fitted run-time, in seconds, for input size(s) `n`."""
+        n = np.asarray(n, dtype=float)
+        return self.constant + self.factor * COMPLEXITIES[self.name](n)
+
+
+def fit_complexity(sizes: list[int], times: list[float]) -> list[Complexity]:
+    """Fit each complexity class to the run-times and return the fits, best first.
+
+    The fits minimise the relative errors, so that small run-times count as much
+    as large ones. A class is only fitted if its growth term is positive and
+    adds at least 10% to the run-time over the given sizes; the constant
+    class is always fitted. Classes that overflow for the sizes are skipped.
+    """
+    n = np.asarray(sizes, dtype=float)
+    t = np.asarray(times, dtype=float)
+    fits = []
+    for name, growth in COMPLEXITIES.items():
+        with np.errstate(over="ignore"):
+            g = np.asarray(growth(n), dtype=float)
+        if not np.all(np.isfinite(g)):
+            continue
+        # divide each equation by the run-time to minimise the relative errors
+        columns = [np.ones_like(n)] if name == "1" else [np.ones_like(n), g]
+        design = np.column_stack(columns) / t[:, np.newaxis]
+        solution = np.linalg.lstsq(design, np.ones_like(t), rcond=None)[0]
+        constant, factor = solution[0], solution[1] if name != "1" else 0.0
+        if name != "1" and factor * (g.max() - g.min()) < 0.1 * t.max():
+            continue
+        fitted = constant + factor * g
+        error = float(np.sqrt(np.mean(((fitted - t) / t) ** 2)))
+        total = np.sum((t - t.mean()) ** 2)
+        r2 = float(1 - np.sum((t - fitted) ** 2) / total) if total else 1.0
+        fits.append(Complexity(name, float(constant), float(factor), error, r2))
+    return sorted(fits, key=lambda fit: fit.error)
+
+
+def estimate_complexity(
+    function: Callable,
+    inputs: Callable,
+    start: int,
+    double: int,
+    text: bool = True,
+    chart: bool = False,
+    force: bool = False,
+    copy: bool = False,
+) -> Complexity:
+    """Estimate the complexity class of `function` from its run-times.
+
+    `estimate_complexity` times `function` on the inputs generated for sizes
+    `start`, `2*start`, ..., doubling the size `double` times, and fits the run-times
+    against the classes 1, log n, n, n log n, n², n³ and 2ⁿ.
+
+    Args:
+        function (Callable): A function whose run-times will be measured.
+        inputs (Callable): A function to generate inputs when given a specific size.
+        start (int): The starting size for the inputs. Must be positive.
+        double (int): The number of times to double the input size. Must be at least 2.
+        text (bool, optional): If True, print the fitted classes, best first.
+        chart (bool, optional): If True, plot the run-times and the best fit.
+        force (bool, optional): If True, measure the run-times even if they're cached
+            (see `cache_timings`).
+        copy (bool, optional): If True, call the function on a fresh copy of
+            the input each time (see `time_functions`).
+
+    Returns:
+        Complexity: The best-fitting class, with its constants and fit scores.
+
+    Raises:
+        AssertionError: If input conditions are not satisfied.
+    """
+    assert start > 0, "the start size must be positive"
+    assert double >= 2, "must double the input size at least twice"
+
+    def instances(size: int) -> list[tuple[Callable, tuple]]:
+        return [(function, inputs(size))]
+
+    sizes = doubling_sizes(start, double)
+    run_times = measure(instances, sizes, 0, 0, [(function, inputs)], force, copy)
+    times = [time for time, _ in run_times]
+    fits = fit_complexity(sizes, times)
+    best = fits[0]
+    scale, unit = scale_and_unit(min(times))
+    if text:
+        print(f"Complexity of {function.__name__} on {inputs.__name__}\n")
+        print(f"{'Class':>7} {'Constant':>10} {'Factor':>12} {'Error':>6} {'R²':>6}")
+        for fit in fits:
+            print(
+                f"{fit.name:>7} {fit.constant * scale:>10.1f} "
+                f"{fit.factor * scale:>12.4g} {fit.error:>6.1%} {fit.r2:>6.3f}"
+            )
+        print(f"\nBest fit: time ≈ {best.constant * scale:.1f}", end="")
+        if best.name != "1":
+            print(f" + {best.factor * scale:.4g} * {best.name}", end="")
+        print(f" {unit}")
+    if chart:
+        curve = np.linspace(sizes[0], sizes[-1], 200)
+        plt.title(f"Run-times for {function.__name__}")
+        plt.xlabel("Input size")
+        plt.ylabel(f"Run-time ({unit})")
+        plt.plot(sizes, [time * scale for time in times], "bo", label="measured")
+        plt.plot(curve, best(curve) * scale, "r-", label=f"fitted {best.name}")
+        plt.legend()
+        plt.show()
+    return best
+
+
+# Crossover search
+# ----------------
+
+
+class Crossover(NamedTuple):
+    """The input size from which one function becomes faster than another."""
+
+    size: int  #: the estimated crossover size
+    lower: int  #: the largest size at which the first faster function is faster
+    upper: int  #: the smallest size at which the other function is faster
+    measured: int  #: the number of sizes at which the functions were timed
+
+
+def find_crossover(
+    f: Callable,
+    g: Callable,
+    inputs: Callable,
+    lo: int,
+    hi: int = 0,
+    precision: float = 0.05,
+    tolerance: float = 0.1,
+    text: bool = True,
+    copy: bool = False,
+) -> Crossover | None:
+    """Find the input size from which `f` becomes faster than `g` or vice versa.
+
+    `find_crossover` times both functions on the inputs of a few sizes,
+    chosen by bisection of the sizes from `lo` to `hi` on a logarithmic scale:
+    the next size is the geometric mean of the largest size at which the faster
+    function at `lo` is still faster and the smallest size at which it isn't.
+    If `hi` is zero, the sizes from `lo` are doubled until the other function
+    is faster, before bisecting.
+
+    The functions are timed with `time_precisely` and are only considered
+    to be faster if their 95% confidence intervals don't overlap. If they overlap,
+    the search stops, with the crossover at that size.
+
+    Args:
+        f (Callable): A function whose run-times will be measured.
+        g (Callable): Another function whose run-times will be measured.
+        inputs (Callable): A function to generate inputs when given a specific size.
+        lo (int): The smallest input size. Must be positive.
+        hi (int, optional): The largest input size, or zero to search upwards from `lo`.
+        precision (float, optional): The precision of the run-times.
+        tolerance (float, optional): Stop when the crossover is known within
+            this fraction of its size, e.g. 0.1 for ±5%.
+        text (bool, optional): If True, print the run-times and the crossover.
+        copy (bool, optional): If True, call the functions on a fresh copy of
+            the input each time (see `time_functions`).
+
+    Returns:
+        Crossover | None: The crossover size and its bounds, or None if the
+            same function is faster from `lo` to `hi`, or up to 2**20 times `lo`.
+
+    Raises:
+        AssertionError: If input conditions are not satisfied.
+    """
+    assert lo > 0, "the smallest size must be positive"
+    assert hi == 0 or hi > lo, "the largest size must be zero or larger than lo"
+    assert tolerance > 0, "the tolerance must be positive"
+
+    scale = unit = None  # no scale determined yet
+    measured = []
+
+    def faster(size: int) -> int:
+        """Return -1 if f is faster at `size`, 1 if g is, and 0 if undecided."""
+        nonlocal scale, unit
+        instance = inputs(size)
+        time_f, error_f = time_precisely(f, *instance, precision=precision, copy=copy)
+        time_g, error_g = time_precisely(g, *instance, precision=precision, copy=copy)
+        measured.append(size)
+        if text:
+            if not scale:
+                scale, unit = scale_and_unit(min(time_f, time_g))
+                print(f"Crossover of {f.__name__} and {g.__name__}\n")
+                print(f"Input size {f.__name__[:15]:>15} {g.__name__[:15]:>15}")
+            print(
+                f"{size:>10} {time_f * scale:>15.1f} {time_g * scale:>15.1f} {unit}"
+            )
+        if abs(time_f - time_g) <= time_f * error_f + time_g * error_g:
+            return 0
+        return -1 if time_f < time_g else 1
+
+    first = faster(lo)
+    if first == 0:
+        crossover = Crossover(lo, lo, lo, len(measured))
+    else:
+        lower = lo
+        if hi:
+            upper = hi
+            winner = faster(hi)
+        else:
+            upper = lo * 2
+            while (winner := faster(upper)) == first and upper < lo * 2**20:
+                lower, upper = upper, upper * 2
+        if winner == first:
+            if text:
+                name = f.__name__ if first < 0 else g.__name__
+                print(f"\n{name} is faster for all sizes from {lo} to {upper}")
+            return None
+        crossover = Crossover(upper, lower, upper, len(measured))
+        while winner and upper - lower > 1 and upper > lower * (1 + tolerance):
+            middle = round(math.sqrt(lower * upper))
+            middle = min(max(middle, lower + 1), upper - 1)
+            winner = faster(middle)
+            if winner == first:
+                lower = middle
+            elif winner:
+                upper = middle
+            crossover = Crossover(middle, lower, upper, len(measured))
+        if winner:
+            size = round(math.sqrt(lower * upper))
+            crossover = Crossover(size, lower, upper, len(measured))
+    if text:
+        print(f"\nCrossover at input size {crossover.size}", end=" ")
+        print(f"(between {crossover.lower} and {crossover.upper})")
+    return crossover
+
+
+# Amortised costs
+# ---------------
+
+
+def clock_overhead() -> int:
+    """Return the nanoseconds that timing an operation adds to its run-time.
+
+    It's the median time of an empty pair of `perf_counter_ns` calls,
+    stored like the latencies in `operation_times`, measured once per process.
+    """
+    global clock_pair
+    if not clock_pair:
+        latencies = np.zeros(10000, dtype=np.int64)
+        for index in range(len(latencies)):
+            start = perf_counter_ns()
+            latencies[index] = perf_counter_ns() - start
+        clock_pair = int(np.median(latencies))
+    return clock_pair
+
+
+def operation_times(
+    structure_factory: Callable, operation: Callable, n: int, repeat: int = 1
+) -> np.ndarray:
+    """Return the run-time, in seconds, of each of `n` operations on a structure.
+
+    Create an empty structure with `structure_factory()` and call
+    `operation(structure, index)` for each index from 0 to n-1, e.g. to append
+    the index to a list. Each call is timed with `time.perf_counter_ns` and
+    the run-times are stored in an array allocated beforehand.
+    The overhead of the clock calls (see `clock_overhead`) is subtracted.
+    If `repeat` is more than 1, the operations are done on that many new
+    structures and the fastest run-time of each operation is returned.
+    The garbage collector isn't disabled, so its pauses are included.
+    """
+    assert n > 0, "the number of operations must be positive"
+    assert repeat > 0, "the number of repetitions must be positive"
+    empty = clock_overhead()
+    fastest = np.full(n, np.iinfo(np.int64).max)
+    latencies = np.zeros(n, dtype=np.int64)
+    for _ in range(repeat):
+        structure = structure_factory()
+        for index in range(n):
+            start = perf_counter_ns()
+            operation(structure, index)
+            latencies[index] = perf_counter_ns() - start
+        np.minimum(fastest, latencies, out=fastest)
+    return np.maximum(fastest - empty, 0) / 1e9
+
+
+def time_operations(
+    structure_factory: Callable,
+    operation: Callable,
+    n: int,
+    text: bool = True,
+    chart: bool = False,
+    repeat: int = 1,
+) -> Timings:
+    """Measure, print or plot the amortised and worst-case costs of `n` operations.
+
+    `time_operations` times each of `n` operations on a growing structure
+    (see `operation_times`), e.g. `time_operations(list, list.append, 10000)`.
+    For 1, 2, 4, ... and `n` operations done, it shows the amortised cost,
+    i.e. the mean run-time of all operations so far, and the median and maximum
+    run-times of the operations done since the previous number of operations.
+    A constant amortised cost with growing maximums shows occasional costly
+    operations, like resizing the structure, that are paid for by the others.
+    The overhead of timing each operation is subtracted and shown in the notes.
+
+    Args:
+        structure_factory (Callable): A function that returns an empty structure.
+        operation (Callable): A function that takes the structure and the index
+            of the operation, from 0 to n-1, and changes the structure.
+        n (int): The number of operations to do. Must be positive.
+        text (bool, optional): If True, print the costs in text format.
+        chart (bool, optional): If True, plot the costs using a chart.
+        repeat (int, optional): The number of new structures on which to do
+            the operations. The fastest run-time of each operation is kept.
+
+    Returns:
+        Timings: The costs, labelled 'amortised', 'median' and 'maximum',
+            for each number of operations done.
+
+    Raises:
+        AssertionError: If input conditions are not satisfied.
+    """
+    assert n > 0, "the number of operations must be positive"
+    assert repeat > 0, "the number of repetitions must be positive"
+
+    latencies = operation_times(structure_factory, operation, n, repeat)
+    counts = doubling_sizes(1, int(math.log2(n)))
+    if counts[-1] < n:
+        counts.append(n)
+    metadata = {
+        "repeat": repeat,
+        "baseline": clock_overhead() / 1e9,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    timings = Timings(
+        f"{operation.__name__} on {structure_factory.__name__}",
+        ["amortised", "median", "maximum"],
+        counts,
+        "Operations",
+        metadata,
+    )
+    total = np.cumsum(latencies)
+    previous = 0
+    for index, count in enumerate(counts):
+        latest = latencies[previous:count]
+        timings.times[:, index] = [
+            total[count - 1] / count,
+            np.median(latest),
+            latest.max(),
+        ]
+        previous = count
+    if text:
+        print(timings)
+    if chart:
+        timings.chart()
+    if ipython := get_ipython():
+        timings.shown = ipython.execution_count
+    return timings
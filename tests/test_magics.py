@@ -1,6 +1,15 @@
 """Automated testing for %ruff and %allowed"""
 
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError
+
 import algoesup
+import algoesup.cli
 import pytest
 from IPython.core.interactiveshell import InteractiveShell
 from IPython.utils.capture import capture_output
@@ -334,6 +343,9 @@ def ipython_shell():
     # Cleanup algoesup.magic's global state, and reset shell session.
     shell.run_cell("%ruff off")
     shell.run_cell("%allowed off")
+    shell.run_cell("%pytype off")
+    shell.run_cell("%lint sync --batch 0 --backend subprocess --clear-cache")
+    algoesup.magics.background_runs.submit(lambda: None).result()
     shell.reset(new_session=True)
 
 
@@ -488,3 +500,335 @@ def test_allowed(
     markdown_outputs = get_markdown(captured)
     if markdown_outputs:
         assert_str_equal(markdown_outputs[0], expected)
+
+
+@pytest.mark.parametrize("backend", ["inprocess", "worker"])
+@pytest.mark.parametrize("test_input, expected", allowed_tests)
+def test_allowed_backends(
+    ipython_shell: InteractiveShell, test_input: str, expected: str, backend: str
+) -> None:
+    """Test that %allowed shows the same warnings when run in-process or in a worker."""
+    with capture_output() as captured:
+        ipython_shell.run_cell(f"%lint --backend {backend}")
+        ipython_shell.run_cell("%allowed on -m")
+        ipython_shell.run_cell(test_input)
+    markdown_outputs = get_markdown(captured)
+    assert_str_equal(markdown_outputs[0], expected)
+
+
+def test_checkers_order(ipython_shell: InteractiveShell) -> None:
+    """Test that the outputs of checkers running in parallel are in alphabetical order."""
+    with capture_output() as captured:
+        ipython_shell.run_cell("%ruff on")
+        ipython_shell.run_cell("%allowed on -m")
+        ipython_shell.run_cell("import numpy as np\nmax = 0")
+    markdown_outputs = get_markdown(captured)
+    assert_str_equal(markdown_outputs[0], ALLOWED_FOUND + allowed_issue(1, "numpy"))
+    assert_str_equal(
+        markdown_outputs[1], RUFF_FOUND + ruff_warning(2, "A001", var="max")
+    )
+
+
+def test_lint_async(ipython_shell: InteractiveShell) -> None:
+    """Test that in background mode the checkers' output is shown when available."""
+    with capture_output() as captured:
+        ipython_shell.run_cell("%lint async")
+        ipython_shell.run_cell("%ruff on")
+        ipython_shell.run_cell("max = 0")
+        # wait for the background checks to finish
+        algoesup.magics.background_runs.submit(lambda: None).result()
+    assert "linters run in the background" in captured.stdout
+    markdown_outputs = get_markdown(captured)
+    assert_str_equal(markdown_outputs[0], "")  # placeholder
+    assert_str_equal(
+        markdown_outputs[-1], RUFF_FOUND + ruff_warning(1, "A001", var="max")
+    )
+
+
+def test_run_command_cancelled() -> None:
+    """Test that a cancelled command is stopped."""
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(CancelledError):
+        algoesup.magics.run_command(
+            [sys.executable, "-c", "import time; time.sleep(10)"], None, cancel
+        )
+
+
+def test_run_command_input() -> None:
+    """Test that a command that can be cancelled gets its input, however slow."""
+    output = algoesup.magics.run_command(
+        [sys.executable, "-c", "import sys, time; time.sleep(0.5); print(input())"],
+        "hi",
+        threading.Event(),
+    )
+    assert output.returncode == 0
+    assert output.stdout.strip() == "hi"
+
+
+def test_lint_cache(ipython_shell: InteractiveShell, monkeypatch) -> None:
+    """Test that unchanged cells aren't checked again, unless the options change."""
+    commands = []
+    run_command = algoesup.magics.run_command
+
+    def counting_run_command(command, stdin, cancel, *limits):
+        commands.append(command)
+        return run_command(command, stdin, cancel, *limits)
+
+    monkeypatch.setattr(algoesup.magics, "run_command", counting_run_command)
+    with capture_output() as captured:
+        ipython_shell.run_cell("%ruff on")
+        ipython_shell.run_cell("max = 0")
+        ipython_shell.run_cell("max = 0")
+        ipython_shell.run_cell("%ruff on --ignore A001")
+    markdown_outputs = get_markdown(captured)
+    expected = RUFF_FOUND + ruff_warning(1, "A001", var="max")
+    assert markdown_outputs[:2] == [expected, expected]
+    # one run per new cell, the repeated cell is cached
+    assert len(commands) == 3
+    # the new options discarded the outputs for the old ones
+    assert len([key for key in algoesup.magics.cache if key.startswith("ruff-")]) == 1
+
+
+def test_cache_key_config(tmp_path, monkeypatch) -> None:
+    """Test that changing a configuration file changes the cache key."""
+    monkeypatch.chdir(tmp_path)
+    config = tmp_path / "course.json"
+    config.write_text("{}")
+    command = ["allowed", "-c", "course.json"]
+    key = algoesup.magics.cache_key("allowed", command, "x = 1")
+    os.utime(config, (0, 0))
+    assert algoesup.magics.cache_key("allowed", command, "x = 1") != key
+    key = algoesup.magics.cache_key("ruff", ["ruff"], "x = 1")
+    (tmp_path / "ruff.toml").write_text("line-length = 100")
+    assert algoesup.magics.cache_key("ruff", ["ruff"], "x = 1") != key
+
+
+def test_pytype_inprocess(tmp_path) -> None:
+    """Test that pytype's in-process output is like its command's output."""
+    pytest.importorskip("pytype")
+    file = tmp_path / "cell.py"
+    file.write_text("def f(x: int) -> str:\n    return x")
+    filename = str(file).replace("\\", "/")
+    output = algoesup.runner.check(["pytype", "--disable", "name-error", filename])
+    assert output.returncode == 1
+    assert output.stderr == ""
+    assert f"{filename}:2:5: error: in f: bad return type [bad-return-type]" in (
+        output.stdout
+    )
+
+
+def test_worker_restart() -> None:
+    """Test that the worker process is restarted after it stops."""
+    algoesup.runner.start_worker()
+    algoesup.runner.worker.kill()
+    algoesup.runner.worker.wait()
+    output = algoesup.runner.check_in_worker(["allowed", "--version"])
+    assert output.stdout.startswith("allowed")
+    algoesup.runner.stop_worker()
+
+
+def test_pytype_notebook(ipython_shell: InteractiveShell) -> None:
+    """Test that %pytype --notebook checks a cell in the context of previous cells."""
+    pytest.importorskip("pytype")
+    with capture_output() as captured:
+        ipython_shell.run_cell("%lint --backend worker")
+        ipython_shell.run_cell("%pytype on --notebook")
+        ipython_shell.run_cell("def double(x: int) -> int:\n    return 2 * x")
+        ipython_shell.run_cell("y = 1")
+        ipython_shell.run_cell("z = double('a')\nprint(undefined)")
+    markdown_outputs = get_markdown(captured)
+    assert markdown_outputs[0].startswith("**pytype** found issues:")
+    assert "- 1:5: error: in <module>: Function double was called" in (
+        markdown_outputs[0]
+    )
+    assert "- 2:7: error: in <module>: Name 'undefined' is not defined" in (
+        markdown_outputs[0]
+    )
+    # the cell defining y isn't part of the context
+    code, _ = algoesup.magics.notebook_code(next(reversed(algoesup.magics.cells)))
+    assert "y = 1" not in code
+
+
+def test_notebook_code_locals(monkeypatch) -> None:
+    """Test that names assigned only within functions aren't global definitions."""
+    monkeypatch.setattr(algoesup.magics, "cells", type(algoesup.magics.cells)())
+    algoesup.magics.add_cell("a", "x = 1\nfor i in range(3):\n    y = i")
+    algoesup.magics.add_cell("b", "def f():\n    x = 2\n    return [x for z in 'ab']")
+    algoesup.magics.add_cell("c", "print(x, y)")
+    code, _ = algoesup.magics.notebook_code("c")
+    assert "x = 1" in code and "def f" not in code
+    defined, _ = algoesup.magics.defined_and_used("def g():\n    global w\n    w = 1")
+    assert defined == {"g", "w"}
+
+
+def test_lint_batch(ipython_shell: InteractiveShell, monkeypatch) -> None:
+    """Test that cells executed in quick succession are linted together."""
+    commands = []
+    run_command = algoesup.magics.run_command
+
+    def counting_run_command(command, stdin, cancel, *limits):
+        commands.append(command)
+        return run_command(command, stdin, cancel, *limits)
+
+    monkeypatch.setattr(algoesup.magics, "run_command", counting_run_command)
+    with capture_output() as captured:
+        ipython_shell.run_cell("%ruff on")
+        ipython_shell.run_cell("%allowed on -m")
+        ipython_shell.run_cell("%lint async --batch 0.5")
+        commands.clear()
+        ipython_shell.run_cell("max = 0")
+        ipython_shell.run_cell("x = 1\nimport numpy as np")
+        ipython_shell.run_cell("l = 42")
+        time.sleep(1)
+        algoesup.magics.background_runs.submit(lambda: None).result()
+    assert len(commands) == 2  # one per checker
+    markdown_outputs = [md for md in get_markdown(captured) if md]
+    assert markdown_outputs == [
+        RUFF_FOUND + ruff_warning(1, "A001", var="max"),
+        ALLOWED_FOUND
+        + allowed_issue(2, "numpy")
+        + "\n\n"
+        + RUFF_FOUND
+        + r"- 2: \[[E402](https://docs.astral.sh/ruff/rules/module-import-not-at-top-of-file)\] "
+        + "Module level import not at top of cell",
+        RUFF_FOUND + ruff_warning(1, "E741", var="l"),
+    ]
+
+
+def test_lint_batch_error(monkeypatch) -> None:
+    """Test that a failing checker doesn't stop the others' output in a batch."""
+    timed_run_checker = algoesup.magics.timed_run_checker
+
+    def failing_allowed(checker, *args):
+        if checker == "allowed":
+            raise RuntimeError("allowed failed")
+        return timed_run_checker(checker, *args)
+
+    monkeypatch.setattr(algoesup.magics, "timed_run_checker", failing_allowed)
+    outputs = [algoesup.cli.CellOutput(index) for index in (1, 2)]
+    batch = [
+        ({"allowed": (code, 0), "ruff": (code, 0)}, output, threading.Event(), 0)
+        for code, output in zip(["x = 1", "max = 0"], outputs)
+    ]
+    algoesup.magics.lint_batch(batch)
+    for output in outputs:
+        assert "Error on executing allowed:\nallowed failed" in output.markdown
+    assert RUFF_FOUND + ruff_warning(1, "A001", var="max") in outputs[1].markdown
+
+
+def test_cli_lint(tmp_path) -> None:
+    """Test that the lint command honours the notebook's magics."""
+    cells = ["%ruff on\nmax = 0", "%ruff off\n%allowed on\nimport numpy", "l = 42"]
+    notebook = {
+        "cells": [
+            {"cell_type": "code", "metadata": {}, "outputs": [], "source": cell}
+            for cell in cells
+        ],
+        "metadata": {},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+    path = tmp_path / "essay.ipynb"
+    path.write_text(json.dumps(notebook))
+    algoesup.cli.main(["lint", str(path), "-f", "json", "-o", str(tmp_path / "out")])
+    report = json.loads((tmp_path / "out" / "essay.json").read_text())
+    assert report["notebook"] == str(path)
+    assert report["cells"] == [
+        {"cell": 1, "markdown": RUFF_FOUND + ruff_warning(2, "A001", var="max")},
+        {"cell": 2, "markdown": ALLOWED_FOUND + allowed_issue(3, "numpy")},
+    ]
+
+
+def test_cli_lint_folders(tmp_path) -> None:
+    """Test that notebooks with the same name in different folders get own reports."""
+    for folder, cell in (("a", "max = 0"), ("b", "x = 0")):
+        notebook = {
+            "cells": [{"cell_type": "code", "metadata": {}, "source": cell}],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+        (tmp_path / "in" / folder).mkdir(parents=True)
+        (tmp_path / "in" / folder / "essay.ipynb").write_text(json.dumps(notebook))
+    algoesup.cli.main(
+        ["lint", str(tmp_path / "in"), "--ruff", "-o", str(tmp_path / "out")]
+    )
+    assert "A001" in (tmp_path / "out" / "a" / "essay.md").read_text()
+    assert "No issues found." in (tmp_path / "out" / "b" / "essay.md").read_text()
+
+
+def test_cli_lint_error(tmp_path, capsys) -> None:
+    """Test that a malformed notebook doesn't stop the others from being linted."""
+    (tmp_path / "bad.ipynb").write_text("{")
+    (tmp_path / "good.ipynb").write_text(json.dumps({"cells": [], "metadata": {}}))
+    algoesup.cli.main(["lint", str(tmp_path), "-f", "json"])
+    bad, good = json.loads(capsys.readouterr().out)
+    assert bad["error"].startswith("JSONDecodeError: ")
+    assert bad["cells"] == good["cells"] == []
+    assert "error" not in good
+
+
+def test_run_command_timeout() -> None:
+    """Test that a command is stopped after its timeout."""
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        algoesup.magics.run_command(
+            [sys.executable, "-c", "import time; time.sleep(10)"], None, None, 0.5
+        )
+    assert time.monotonic() - start < 5
+    # the input is sent once, even if the command runs for more than 0.1s
+    output = algoesup.magics.run_command(
+        [sys.executable, "-c", "import time; time.sleep(0.5); print(input())"],
+        "hi",
+        None,
+        5,
+    )
+    assert output.stdout.strip() == "hi"
+
+
+def test_lint_limits(ipython_shell: InteractiveShell) -> None:
+    """Test that checkers exceeding their limits are reported as not checking."""
+    with capture_output() as captured:
+        ipython_shell.run_cell("%pytype on --timeout 0.01")
+        ipython_shell.run_cell("x = 1")
+    assert get_markdown(captured)[-1] == "**pytype** didn't check code:"
+    assert "pytype was stopped after running for 0.01s" in captured.stdout
+    if sys.platform == "linux":
+        with capture_output() as captured:
+            ipython_shell.run_cell("%pytype off")
+            ipython_shell.run_cell("%ruff on --memory 5")
+            ipython_shell.run_cell("y = 1")
+        assert get_markdown(captured)[-1] == "**ruff** didn't check code:"
+        assert "ruff was stopped after using over 5 MB of memory" in captured.stdout
+
+
+def test_lintstats(ipython_shell: InteractiveShell, tmp_path) -> None:
+    """Test that the times of each check are recorded, shown and exported."""
+    with capture_output() as captured:
+        ipython_shell.run_cell("%lintstats --clear")
+        ipython_shell.run_cell("%ruff on")
+        ipython_shell.run_cell("x = 1")
+        ipython_shell.run_cell("x = 1")
+        ipython_shell.run_cell("%lintstats")
+    table = get_markdown(captured)[-1].split("\n")
+    assert table[0].startswith("| linter | checks | cached | failed | step |")
+    # the cells are checked after running, so '%lintstats' isn't counted yet
+    assert table[2].startswith("| ruff | 3 | 1 | 0 | transform |")
+    assert [row.split("|")[5].strip() for row in table[2:]] == [
+        "transform",
+        "spawn",
+        "run",
+        "render",
+        "total",
+    ]
+    csv_file = tmp_path / "stats.csv"
+    json_file = tmp_path / "stats.json"
+    with capture_output():
+        ipython_shell.run_cell(f"%lintstats --csv {csv_file} --json {json_file}")
+    records = json.loads(json_file.read_text())
+    assert [record["cached"] for record in records] == [False, False, True, False]
+    assert records[2]["spawn"] == 0
+    assert records[0]["spawn"] > 0
+    header = csv_file.read_text().split("\n")[0]
+    assert header == ",".join(algoesup.magics.STATS_FIELDS)
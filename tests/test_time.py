@@ -0,0 +1,518 @@
+"""Pytest-based tests for algoesup.time."""
+
+import csv
+import json
+import math
+import os
+import threading
+import time
+from functools import partial
+from types import CodeType
+from typing import Callable
+
+import matplotlib
+import numpy as np
+import pytest
+
+from algoesup import time as timing  # the name 'time' conflicts with the module
+
+matplotlib.use("Agg")  # don't open windows for the charts
+
+
+def sleeper(size: int) -> tuple[float]:
+    """Return the input for `time.sleep` to take `size` milliseconds."""
+    return (size / 1000,)
+
+
+def sleep_cases(size: int) -> list:
+    """Return the tasks of sleeping 1 and 2 times `size` milliseconds."""
+    return [(time.sleep, sleeper(size)), (time.sleep, sleeper(2 * size))]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="needs Linux")
+def test_measure_parallel(monkeypatch, capsys) -> None:
+    """Test that parallel workers measure the run-times in the right order."""
+    monkeypatch.setattr(timing, "free_cores", lambda: {0})
+    run_times = [time for time, _ in timing.measure(sleep_cases, [5, 10], 1)]
+    assert capsys.readouterr().out == ""
+    assert len(run_times) == 4
+    assert run_times[0] < run_times[1] < run_times[3]
+    assert run_times[0] < run_times[2] < run_times[3]
+    assert timing.tasks == []
+
+
+def test_measure_serial_fallback(monkeypatch, capsys) -> None:
+    """Test that the run-times are measured serially without enough free cores."""
+    monkeypatch.setattr(timing, "free_cores", lambda: set())
+    run_times = [time for time, _ in timing.measure(sleep_cases, [5], 2)]
+    assert capsys.readouterr().out.startswith("Warning: fewer than 2 free cores")
+    assert len(run_times) == 2
+    assert run_times[0] < run_times[1]
+
+
+def test_measure_interleaved(monkeypatch) -> None:
+    """Test that run-times are measured in random order but returned in order."""
+    orders = []
+    monkeypatch.setattr(timing.random, "shuffle", lambda order: orders.append(order))
+    results = list(timing.measure(sleep_cases, [5, 10], 0, 0.1, interleave=2))
+    assert len(orders) == 2 and sorted(orders[0]) == [0, 1, 2, 3]
+    run_times = [time for time, _ in results]
+    assert run_times[0] < run_times[1] < run_times[3]
+    assert run_times[0] < run_times[2] < run_times[3]
+    assert all(error > 0 for _, error in results)
+
+
+def test_measure_interleaved_two_rounds(monkeypatch) -> None:
+    """Test that the precision of two rounds uses the exact t quantile."""
+    samples = iter([1.0, 1.0, 3.0])  # calibration, then one sample per round
+
+    def timer(loops: int) -> float:
+        return loops * next(samples)
+
+    monkeypatch.setattr(timing, "loop_timer", lambda *args: timer)
+    tasks = timing.measure_interleaved(lambda size: [(abs, (size,))], [1], 2, 0.1)
+    [(mean, precision)] = tasks
+    assert mean == 2.0
+    # the half-width is t(1) = 12.706 times the standard error, which is 1
+    assert precision == pytest.approx(12.706 / 2)
+
+
+def test_time_functions_table(capsys) -> None:
+    """Test the layout of the run-times table."""
+    timing.time_functions([abs, str], timing.int_value, 1, 2)
+    lines = capsys.readouterr().out.split("\n")
+    assert lines[0] == "Inputs generated by int_value"
+    assert lines[2].split() == ["Input", "size", "abs", "str"]
+    assert [line.split()[0] for line in lines[3:]] == ["1", "2", "4"]
+    assert all(line.split()[-1] in ("ns", "µs") for line in lines[3:])
+
+
+def test_timings(capsys, tmp_path) -> None:
+    """Test that the returned run-times can be shown again and exported."""
+    timings = timing.time_functions([abs, str], timing.int_value, 1, 2, chart=True)
+    assert capsys.readouterr().out == repr(timings)
+    assert timings.times.shape == (2, 3)
+    assert timings.sizes.tolist() == [1, 2, 4]
+    assert (timings.times > 0).all()
+    timings.to_csv(tmp_path / "timings.csv")
+    with open(tmp_path / "timings.csv") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["Input size", "abs", "str"]
+    assert float(rows[3][2]) == timings.times[1, 2]
+    timings.to_json(tmp_path / "timings.json")
+    with open(tmp_path / "timings.json") as file:
+        data = json.load(file)
+    assert data["labels"] == ["abs", "str"]
+    assert data["times"] == timings.times.tolist()
+    assert data["metadata"]["precision"] == 0
+
+
+def test_cache_timings(monkeypatch, tmp_path) -> None:
+    """Test that run-times are reused unless forced and that the cache is bounded."""
+    monkeypatch.setattr(timing, "cache_dir", "")
+    monkeypatch.setattr(timing, "cache_size", 1000)
+    timing.cache_timings(str(tmp_path), 4)
+    first = timing.time_functions([abs, str], timing.int_value, 1, 2, text=False)
+    assert len(os.listdir(tmp_path)) == 4  # only the 4 most recent of 6 run-times
+    monkeypatch.setattr(timing, "time_it", lambda *args, **options: 1.0)
+    again = timing.time_functions([str], timing.int_value, 2, 1, text=False)
+    assert again.times.tolist() == [first.times[1, 1:].tolist()]
+    forced = timing.time_functions([str], timing.int_value, 2, 1, False, force=True)
+    assert forced.times.tolist() == [[1.0, 1.0]]
+    again = timing.time_functions([str], timing.int_value, 2, 1, text=False)
+    assert again.times.tolist() == [[1.0, 1.0]]
+    # methods of built-in types can be cached too
+    methods = timing.time_functions([list.sort, sorted], list_input, 1, 0, False)
+    assert methods.times.tolist() == [[1.0], [1.0]]
+    timing.cache_timings("")
+    assert timing.time_functions([abs], timing.int_value, 4, 0, False).times == 1.0
+
+
+def test_code_digest() -> None:
+    """Test that the digest depends on the code but not on the function's location."""
+    namespace: dict = {}
+    exec("def f(n):\n    return n + 1", namespace)
+    digest = timing.code_digest(namespace["f"])
+    exec("\n\ndef f(n):\n    return n + 1", namespace)
+    assert timing.code_digest(namespace["f"]) == digest
+    exec("def f(n):\n    return n + 2", namespace)
+    assert timing.code_digest(namespace["f"]) != digest
+    assert timing.code_digest(abs) == "builtins.abs"
+    assert timing.code_digest(list.sort) == "builtins.list.sort"
+
+
+def add_to(m: int) -> Callable:
+    """Return a function that adds `m` to its input."""
+
+    def add(n: int) -> int:
+        return n + m
+
+    return add
+
+
+class Searcher:
+    """A searcher with an option."""
+
+    def __init__(self, sorted_input: bool) -> None:
+        """Set whether the input is sorted."""
+        self.sorted_input = sorted_input
+
+    def search(self, items: list) -> bool:
+        """Return whether the first item occurs again."""
+        return items[0] in items[1:]
+
+
+def test_code_digest_bound() -> None:
+    """Test that bound methods and partial functions depend on their arguments."""
+    digest = timing.code_digest(Searcher(True).search)
+    assert timing.code_digest(Searcher(True).search) == digest
+    assert timing.code_digest(Searcher(False).search) != digest
+    assert timing.code_digest([1].append) != timing.code_digest([2].append)
+    assert timing.code_digest(partial(pow, 2)) == timing.code_digest(partial(pow, 2))
+    assert timing.code_digest(partial(pow, 2)) != timing.code_digest(partial(pow, 3))
+
+
+def test_code_digest_closure() -> None:
+    """Test that closures capturing different values have different digests."""
+    assert timing.code_digest(add_to(1)) == timing.code_digest(add_to(1))
+    assert timing.code_digest(add_to(1)) != timing.code_digest(add_to(1000))
+
+
+def list_input(size: int) -> tuple[list[int]]:
+    """Return a list of `size` integers."""
+    return (list(range(size)),)
+
+
+def test_peak_memory(capsys) -> None:
+    """Test that the peak memory is measured in a separate table."""
+    timings = timing.time_functions([len, list], list_input, 1000, 1, memory=True)
+    output = capsys.readouterr().out
+    assert output == repr(timings)
+    assert "Inputs generated by list_input (peak memory)" in output
+    assert all(timings.memory[0] < 100)  # just the int returned
+    assert 8000 <= timings.memory[1, 0] < 10000
+    assert 16000 <= timings.memory[1, 1] < 18000
+    assert timings.to_dict()["memory"] == timings.memory.tolist()
+    # the copy of the input is made before tracing the memory
+    assert timing.peak_memory(insertion_sort, list(range(10000)), copy=True) < 1000
+
+
+def test_time_samples() -> None:
+    """Test that each sample is the mean run-time of a batch of calls."""
+    samples = timing.time_samples(time.sleep, 0.001, samples=5, batch=2)
+    assert len(samples) == 5
+    assert all(0.001 <= samples) and all(samples < 0.01)
+    # the copies aren't timed
+    samples = timing.time_samples(insertion_sort, list(range(10000)), copy=True)
+    assert np.median(samples) < 0.01
+
+
+def test_time_functions_samples(capsys) -> None:
+    """Test that the distribution of the run-times is shown after the table."""
+    timings = timing.time_functions([time.sleep], sleeper, sizes=[1, 100], samples=20)
+    output = capsys.readouterr().out
+    assert output == repr(timings)
+    assert "Inputs generated by sleeper (distribution of run-times)" in output
+    assert len(timings.samples[0][0]) == 20
+    assert len(timings.samples[0][1]) < 10  # sampled for a second at most
+    percentiles = timings.percentiles()
+    assert (np.diff(percentiles, axis=2) >= 0).all()
+    assert 0.1 <= percentiles[0, 1, 0] < 0.2
+    assert timings.to_dict()["percentiles"] == percentiles.tolist()
+
+
+def cubic_sleep(n: int) -> None:
+    """Sleep for 0.05 n³ seconds."""
+    time.sleep(0.05 * n**3)
+
+
+def sleep_after_1(n: int) -> None:
+    """Sleep for 10 seconds, unless n is 1."""
+    if n > 1:
+        time.sleep(10)
+
+
+def test_timeout(capsys) -> None:
+    """Test that functions projected to exceed the timeout aren't timed further."""
+    start = time.perf_counter()
+    timings = timing.time_functions_int([cubic_sleep], start=1, double=2, timeout=2)
+    assert time.perf_counter() - start < 5
+    assert math.isnan(timings.times[0, 2])
+    assert timings.dropped["cubic_sleep"].startswith("it would take about")
+    output = capsys.readouterr().out
+    assert output == repr(timings)
+    assert output.split("\n")[-3].split() == ["4", "-", "ms"]
+    assert output.split("\n")[-1].startswith(
+        "cubic_sleep wasn't timed on larger inputs: it would take"
+    )
+
+
+def test_isolate() -> None:
+    """Test that isolated measurements are stopped after the timeout."""
+    start = time.perf_counter()
+    timings = timing.time_functions_int(
+        [sleep_after_1], start=1, double=1, text=False, timeout=2, isolate=True
+    )
+    assert time.perf_counter() - start < 8
+    assert timings.times[0, 0] < 1e-6
+    assert math.isnan(timings.times[0, 1])
+    assert timings.dropped == {"sleep_after_1": "it didn't finish within 4 s"}
+
+
+def test_isolate_workers(capsys) -> None:
+    """Test that isolated measurements are taken serially, not by workers."""
+    timings = timing.time_functions(
+        [abs], timing.int_value, 1, 1, workers=1, isolate=True
+    )
+    assert capsys.readouterr().out.startswith(
+        "Warning: timing serially, to time in separate processes"
+    )
+    assert not np.isnan(timings.times).any()
+
+
+def test_over_budget() -> None:
+    """Test the projection of the next measurement's time."""
+    run_times = np.array([0.01, 0.04, np.nan])  # quadratic growth
+    sizes = np.array([1, 2, 4])
+    assert timing.over_budget(run_times, sizes, 1, 3, 0, 0) == ""
+    assert timing.over_budget(run_times, sizes, 1, 3, 1, 0) == ""
+    assert timing.over_budget(run_times, sizes, 1, 3, 0.4, 0).startswith(
+        "it would take about 0.48 s"
+    )
+    assert timing.over_budget(run_times, sizes, 1, 3, 0, 0.4).endswith(
+        "more than the 0.4 s left"
+    )
+    assert timing.over_budget(run_times, sizes, 1, 3, 0.1, 0) == "it took 0.12 s"
+
+
+def test_timeout_fast(capsys) -> None:
+    """Test that fast functions aren't dropped because of the timing loop's time."""
+    timings = timing.time_functions([abs, str], timing.int_value, 1, 2, timeout=0.5)
+    assert not timings.dropped
+    assert not np.isnan(timings.times).any()
+    isolated = timing.time_functions(
+        [abs], timing.int_value, 1, 1, text=False, timeout=0.5, isolate=True
+    )
+    assert not isolated.dropped
+    capsys.readouterr()
+
+
+def insertion_sort(values: list) -> None:
+    """Sort the values in-place."""
+    for end in range(1, len(values)):
+        index = end
+        while index > 0 and values[index - 1] > values[index]:
+            values[index - 1], values[index] = values[index], values[index - 1]
+            index -= 1
+
+
+def test_time_it_copy() -> None:
+    """Test that functions modifying their input are timed on fresh copies."""
+    descending = list(range(200, 0, -1))
+    fresh = timing.time_it(insertion_sort, descending, copy=True)
+    assert descending == list(range(200, 0, -1))
+    ascending = timing.time_it(insertion_sort, list(range(200)))
+    assert fresh > 10 * ascending
+    precise, _ = timing.time_precisely(insertion_sort, descending, copy=True)
+    assert precise > 10 * ascending
+
+
+def test_schedule_sizes() -> None:
+    """Test the input sizes grown by a factor and by a step."""
+    assert timing.schedule_sizes(10, 3) == timing.doubling_sizes(10, 3)
+    assert timing.schedule_sizes(10, 3, factor=1.5) == [10, 15, 22, 34]
+    assert timing.schedule_sizes(1, 3, factor=1.1) == [1, 2, 3, 4]
+    assert timing.schedule_sizes(10, 3, step=5) == [10, 15, 20, 25]
+
+
+def test_adaptive_size() -> None:
+    """Test that sizes are added where the run-times' growth changes."""
+    sizes = np.array([1, 2, 4, 8, 16])
+    times = np.array([sizes * 1.0, np.where(sizes < 8, sizes, sizes**3)])
+    assert timing.adaptive_size(sizes, times) == 6  # between 4 and 8
+    assert timing.adaptive_size(np.array([4, 16]), times[:, :2]) == 8
+    assert timing.adaptive_size(np.array([1, 2, 3]), times[:, :3]) is None
+
+
+def test_time_functions_sizes(capsys) -> None:
+    """Test that explicit and adaptive sizes are timed and kept in order."""
+    timings = timing.time_functions(
+        [abs], timing.int_value, sizes=[1, 10, 100], adaptive=1
+    )
+    added = 3 if timings.sizes[1] == 3 else 32
+    assert timings.sizes.tolist() == sorted([1, 10, 100, added])
+    assert not np.isnan(timings.times).any()
+    lines = capsys.readouterr().out.split("\n")
+    assert lines[-2] == "Sizes added where the run-times' growth changes most:"
+    assert lines[-1].split()[0] == str(added)
+
+
+def test_direct_timer() -> None:
+    """Test that the timing loop calls the function directly on the arguments.
+
+    The loop is checked instead of racing it against a lambda, which is flaky.
+    """
+    calls = []
+    timing.direct_timer(lambda *args: calls.append(args), (1, "a", None)).timeit(2)
+    timing.direct_timer(lambda: calls.append(()), ()).timeit(1)
+    assert calls == [(1, "a", None), (1, "a", None), ()]
+    loop = timing.direct_timer(abs, (1, "a", None)).inner.__code__
+    assert {"function", "arg0", "arg1", "arg2"} <= set(loop.co_varnames)
+    assert not any(isinstance(const, CodeType) for const in loop.co_consts)
+
+
+def test_baseline(capsys) -> None:
+    """Test that the loop overhead is subtracted from the run-times and shown."""
+    timings = timing.time_functions([abs], timing.int_value, 1, 1, baseline=True)
+    overhead = timing.loop_overhead()
+    assert 0 < overhead < 1e-6
+    assert timings.metadata["baseline"] == overhead
+    output = capsys.readouterr().out
+    assert output == repr(timings)
+    assert output.split("\n")[-1].startswith("The timing loop's overhead (")
+
+
+def test_time_precisely() -> None:
+    """Test that the mean run-time is measured with the requested precision."""
+    start = time.perf_counter()
+    mean, error = timing.time_precisely(time.sleep, 0.002, precision=0.2, budget=2)
+    assert time.perf_counter() - start < 3
+    assert 0.002 <= mean < 0.004
+    assert error <= 0.2
+    # slow functions are sampled twice, even if the budget runs out
+    start = time.perf_counter()
+    mean, error = timing.time_precisely(time.sleep, 0.3, budget=0.5)
+    assert time.perf_counter() - start < 1.2
+    assert 0.3 <= mean < 0.4
+
+
+def test_t_quantile() -> None:
+    """Test the t quantiles for few and many degrees of freedom."""
+    assert timing.t_quantile(1) == 12.706
+    assert timing.t_quantile(2) == 4.303
+    assert timing.t_quantile(30) == 2.042
+    assert timing.t_quantile(40) == pytest.approx(2.021, abs=0.001)
+    assert timing.t_quantile(120) == pytest.approx(1.980, abs=0.001)
+
+
+def test_time_functions_precision(capsys) -> None:
+    """Test that the achieved precision is shown next to each run-time."""
+    timing.time_functions([abs], timing.int_value, 1, 1, precision=0.5)
+    lines = capsys.readouterr().out.split("\n")
+    for line in lines[3:]:
+        _, _, error, _ = line.split()
+        assert error.startswith("±") and error.endswith("%")
+
+
+@pytest.mark.parametrize("name", ["1", "log n", "n", "n log n", "n²", "n³", "2ⁿ"])
+def test_fit_complexity(name: str) -> None:
+    """Test that exact run-times are fitted to their complexity class."""
+    sizes = (
+        timing.doubling_sizes(2, 5) if name == "2ⁿ" else timing.doubling_sizes(1, 10)
+    )
+    exact = timing.Complexity(name, 1e-6, 1e-7 if name != "1" else 0, 0, 1)
+    fits = timing.fit_complexity(sizes, list(exact(sizes)))
+    assert fits[0].name == name
+    assert fits[0].error < 1e-6
+    assert fits[0].constant == pytest.approx(1e-6)
+
+
+def quadratic(items: list) -> int:
+    """Return the number of pairs of items, counting them one by one."""
+    pairs = 0
+    for _ in items:
+        for _ in items:
+            pairs += 1
+    return pairs
+
+
+def test_estimate_complexity(capsys) -> None:
+    """Test that a quadratic function is estimated as such."""
+    best = timing.estimate_complexity(
+        quadratic, lambda n: (list(range(n)),), 32, 3, chart=True
+    )
+    assert best.name == "n²"
+    assert "Best fit: time ≈" in capsys.readouterr().out
+
+
+def square_loop(n: int) -> None:
+    """Loop n² times."""
+    for _ in range(n * n):
+        pass
+
+
+def linear_loop(n: int) -> None:
+    """Loop 1000 + 10n times."""
+    for _ in range(1000 + 10 * n):
+        pass
+
+
+def test_count_functions(capsys) -> None:
+    """Test that the lines executed are counted, in the same table format."""
+    timings = timing.count_functions(
+        [square_loop, linear_loop], timing.int_value, 1, 3, value=True
+    )
+    output = capsys.readouterr().out
+    assert output == timings.table()
+    assert output.endswith("lines")
+    # each iteration executes the loop header and `pass`
+    assert timings.times[0].tolist() == [2 * n * n + 1 for n in (1, 2, 4, 8)]
+    assert timings.times[1].tolist() == [2 * (1000 + 10 * n) + 1 for n in (1, 2, 4, 8)]
+    assert timing.count_steps(square_loop, 4, opcodes=True) > 33
+    assert timing.count_steps(abs, -1) == 0
+
+
+def test_count_steps_threads() -> None:
+    """Test that the lines run by other threads aren't counted."""
+    done = threading.Event()
+
+    def busy() -> None:
+        while not done.is_set():
+            pass
+
+    thread = threading.Thread(target=busy)
+    thread.start()
+    try:
+        assert timing.count_steps(square_loop, 300) == 2 * 300 * 300 + 1
+    finally:
+        done.set()
+        thread.join()
+
+
+def test_find_crossover(capsys) -> None:
+    """Test that the crossover is found with few measurements."""
+    crossover = timing.find_crossover(
+        square_loop, linear_loop, timing.int_value, 1, 1000, precision=0.1
+    )
+    assert crossover.lower <= crossover.size <= crossover.upper
+    assert 20 < crossover.size < 70
+    assert crossover.measured <= 12
+    assert f"Crossover at input size {crossover.size}" in capsys.readouterr().out
+
+
+def test_find_no_crossover(capsys) -> None:
+    """Test that None is returned if the same function is always faster."""
+    assert not timing.find_crossover(linear_loop, square_loop, timing.int_value, 1, 4)
+    assert "square_loop is faster for all sizes from 1 to 4" in capsys.readouterr().out
+
+
+def append_slowly(items: list, index: int) -> None:
+    """Append `index` to `items`, sleeping 10 ms on the 500th operation."""
+    if index == 499:
+        time.sleep(0.01)
+    items.append(index)
+
+
+def test_time_operations(capsys) -> None:
+    """Test the amortised cost and the spikes of operations on a list."""
+    timings = timing.time_operations(list, append_slowly, 1000, repeat=2)
+    assert capsys.readouterr().out == f"{timings!r}\n"
+    assert timings.labels == ["amortised", "median", "maximum"]
+    assert timings.sizes.tolist() == [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1000]
+    amortised, median, maximum = timings.times
+    assert maximum[9] >= 0.01 and maximum[8] < 0.01
+    assert amortised[-1] >= 0.01 / 1000 and median[9] < 0.001
+    assert 0 < timings.metadata["baseline"] == timing.clock_overhead() / 1e9
+    assert "overhead" in timings.notes()
+    latencies = timing.operation_times(list, list.append, 100)
+    assert len(latencies) == 100 and all(latencies >= 0)